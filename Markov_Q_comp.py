@@ -4,9 +4,10 @@
 # Description : Compares different levels of quarantine measures and how they 
 #   affect the rate of infection
 
-import matplotlib.pyplot as plt
-import random
 import numpy as np
+import instrument
+import Markov_engine
+import Markov_ensemble
 
 # SIR/simulation parameters
 #----------------------------------------------------
@@ -17,6 +18,11 @@ N = 10000
 I0 = 10 # amount of initially infected people
 steps = 100000 # amount of steps to take in each simulation
 sims = 20 # amount of simulations to average over
+record = t0 // 24 # steps between recorded states (hourly)
+workers = None # processes to run simulations on (None uses every core)
+seed = 2020 # random seed, fixed so reruns are reproducible and cached (None for a fresh one)
+mode = "tick" # "tick", "ssa" (Gillespie), "tau" (tau-leaping) or "hybrid" (chain then ODE)
+epsilon = 0.03 # accuracy of tau-leaping and of hybrid's ODE steps (smaller is more accurate)
 #----------------------------------------------------
 
 # Quarantine parameters:
@@ -24,67 +30,50 @@ sims = 20 # amount of simulations to average over
 Q_start = 5 # days after start when self-isolation starts
 #----------------------------------------------------
 
-gamma = 1 / serial_interval / t0 # rate of recovery
-k = R0 * gamma # rate of infection
+k, gamma = Markov_engine.rates(R0, serial_interval, t0) # rates of infection/recovery
 
-case_stacks = []
 
-for b in range(0, 5):
-    case_lists = []
-    Q = b * .15
-    
-    for a in range(0, sims):
-        S = N - I0 # susceptible
-        I = I0 # infected
-        R = 0 # recovered
+def run(sims=sims, steps=steps, seed=seed, workers=workers):
+    """Runs every quarantine level on the same replicates.
 
-        case_arr = [I]
-        t_arr = [0]
-    
-        for t in range(t0, steps + t0):
-            delta_I = k * S * I / N # chance of infection
-            delta_R = gamma * I # chance of recovery
-            if t >= Q_start * t0:
-                delta_I *= (1 - Q)
-    
-            step = random.random() # picks random float between 0 and 1
-    
-            if step > 0 and step <= delta_I: # someone is infected
-                I += 1
-                S -= 1
-            elif step > delta_I and step <= delta_R + delta_I: # someone recovers
-                R += 1
-                I -= 1
-            else: # nothing happens
-                pass
-    
-            case_arr.append(I + R) # arrays for plotting
-            t_arr.append(t_arr[-1] + 1 / t0)
+    Level b cuts infections by b * 15% from Q_start on; every level shares the
+    days before Q_start and the same random numbers. Returns the times in
+    days, each level's (S, I, R) RunningStats and each level's change in cases
+    from the first (see Markov_ensemble.compare).
+    """
+    levels = [[(Q_start * t0, 1 - b * .15)] for b in range(0, 5)]
+    stats, differences = Markov_ensemble.compare(N, I0, k, gamma, steps, sims, Q_start * t0, levels,
+                                                 start_tick=t0, seed=seed, mode=mode,
+                                                 epsilon=epsilon, workers=workers, record=record)
+    return Markov_engine.tick_times(steps, t0, record), stats, differences
 
-        case_lists.append(case_arr)
-        
-    case_stacks.append(case_lists)
 
-plotting = []
-for l in case_stacks:
-    case_avg = []
+def summary(differences, sims=sims):
+    # final change in cases of every level against no quarantine, +/- its error
+    for b in range(1, len(differences)):
+        change = differences[b]
+        print("Q =", round(b * .15, 2), ": final cases change by", change.mean[-1], "+/-",
+              change.std[-1] / np.sqrt(sims), "compared to no quarantine")
 
-    for a in range(0, steps + 1):
-        case_vals = []
-        
-        for b in range(0, sims):
-            case_vals.append(l[b][a])
-        
-        case_avg.append(np.average(case_vals))
-    plotting.append(case_avg)
-        
-plt.plot(t_arr, plotting[0], "b", label="None")
-plt.plot(t_arr, plotting[1], "g", label="Minimal")
-plt.plot(t_arr, plotting[2], "r", label="Moderate")
-plt.plot(t_arr, plotting[3], "k", label="Strict")
 
-plt.xlabel("time (days)")
-plt.ylabel("cases")
-plt.title("Effects of Differing Levels of Quarantine")
-plt.legend()
-plt.show()
\ No newline at end of file
+@instrument.timed("plot")
+def plot(t_arr, stats):
+    import matplotlib.pyplot as plt
+    plotting = [I.mean + R.mean for S, I, R in stats] # average cases
+
+    plt.plot(t_arr, plotting[0], "b", label="None")
+    plt.plot(t_arr, plotting[1], "g", label="Minimal")
+    plt.plot(t_arr, plotting[2], "r", label="Moderate")
+    plt.plot(t_arr, plotting[3], "k", label="Strict")
+
+    plt.xlabel("time (days)")
+    plt.ylabel("cases")
+    plt.title("Effects of Differing Levels of Quarantine")
+    plt.legend()
+    plt.show()
+
+
+if __name__ == "__main__":
+    t_arr, stats, differences = run()
+    summary(differences)
+    plot(t_arr, stats)
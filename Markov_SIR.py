@@ -6,13 +6,20 @@
 #   initially infected population, number of intervals in each simulation, and
 #   number of simulations to run. Takes average and standard deviation over all
 #   simulations.
-# Note : step interval must be short enough so that only one transition can
-#   happen, i.e. the sum of chances of a recovery or infection must never
-#   exceed 100% for any step
+# Note : in "tick" mode the step interval must be short enough so that only one
+#   transition can happen, i.e. the sum of chances of a recovery or infection
+#   must never exceed 100% for any step. "ssa" and "tau" modes jump from event
+#   to event and don't have this restriction
 
-import matplotlib.pyplot as plt
-import random
+import datetime
+import os
 import numpy as np
+import instrument
+import interventions
+import Markov_engine
+import Markov_ensemble
+import Markov_checkpoint
+import case_data
 
 # SIR/simulation parameters
 #----------------------------------------------------
@@ -23,6 +30,12 @@ N = 4886000 # total population (New Zealand's population)
 I0 = 46 # amount of initially infected people
 steps = 100000 # amount of steps to take in each simulation
 sims = 100 # amount of simulations to average over
+record = t0 // 24 # steps between recorded states (hourly)
+workers = None # processes to run simulations on (None uses every core)
+seed = 2020 # random seed, fixed so reruns are reproducible and cached (None for a fresh one)
+checkpoint = None # .npz file to save the run to each day and resume it from
+mode = "tick" # "tick", "ssa" (Gillespie), "tau" (tau-leaping) or "hybrid" (chain then ODE)
+epsilon = 0.03 # accuracy of tau-leaping and of hybrid's ODE steps (smaller is more accurate)
 #----------------------------------------------------
 
 # Quarantine parameters:
@@ -37,140 +50,80 @@ full_start = 25 + 2 # start of full lockdown
 full_lockdown = .45 # infection reduction after total lockdown
 #----------------------------------------------------
 
-file = open("total-cases-covid-19.csv", "r") # file containing NZ case data
-entries = file.readlines()
-file.close()
-data = []
-for i in entries:
-    if i[0:11] == "New Zealand":
-        data.append(i)
-
-n = 0        
-while data[n][17:20] != "Mar":
-    n += 1
-
-n -= 2
-
-dates = []
-cases = []
-while data[n][17:20] == "Feb":
-    line = data[n]
-    line = line.split(",")
-    dates.append(int(line[2][5:]) - 28)
-    cases.append(int(line[-1]))
-    n += 1
-    
-while data[n][17:20] == "Mar":
-    line = data[n]
-    line = line.split(",")
-    dates.append(int(line[2][5:]) + 1)
-    cases.append(int(line[-1]))
-    n += 1
-    
-while data[n][17:20] == "Apr":
-    line = data[n]
-    line = line.split(",")
-    dates.append(int(line[2][5:]) + 32)
-    cases.append(int(line[-1]))
-    n += 1
-
-gamma = 1 / serial_interval / t0 # rate of recovery
-k = R0 * gamma # rate of infection
-
-S_lists = []
-I_lists = []
-R_lists = []
-
-for a in range(0, sims):
-    S = N - I0 # susceptible
-    I = I0 # infected
-    R = 0 # recovered
-
-    S_arr = [S] # arrays of S,I,R,t values for plotting
-    I_arr = [I]
-    R_arr = [R]
-    t_arr = [0]
-    
-    for t in range(t0, steps + t0):
-        delta_I = k * S * I / N # chance of infection
-        delta_R = gamma * I # chance of recovery
-        if t >= iso_start * t0 and t < level2_start * t0:
-            delta_I *= (1 - self_isolation)
-        elif t >= level2_start and t < partial_start:
-            delta_I *= (1 - level2)
-        elif t >= partial_start * t0 and t < full_start * t0:
-            delta_I *= (1 - partial_lockdown)
-        elif t >= full_start * t0:
-            delta_I *= (1 - full_lockdown)
-    
-        step = random.random() # picks random float between 0 and 1
-    
-        if step > 0 and step <= delta_I: # someone is infected
-            I += 1
-            S -= 1
-        elif step > delta_I and step <= delta_R + delta_I: # someone recovers
-            R += 1
-            I -= 1
-        else: # nothing happens
-            pass
-    
-        S_arr.append(S) # arrays for plotting
-        I_arr.append(I)
-        R_arr.append(R)
-        t_arr.append(t_arr[-1] + 1 / t0)
-
-    S_lists.append(S_arr)
-    I_lists.append(I_arr)
-    R_lists.append(R_arr)
-
-
-S_avg = [] # averages
-I_avg = []
-R_avg = []
-
-S_dev = [] # standard deviations
-I_dev = []
-R_dev = []
-
-for a in range(0, steps + 1):
-    S_vals = []
-    I_vals = []
-    R_vals = []
-    
-    for b in range(0, sims):
-        S_vals.append(S_lists[b][a])
-        I_vals.append(I_lists[b][a])
-        R_vals.append(R_lists[b][a])
+k, gamma = Markov_engine.rates(R0, serial_interval, t0) # rates of infection/recovery
+
+# quarantine levels by day, in ticks (level2 used to be compared against days
+# instead of ticks and never took effect)
+schedule = interventions.Schedule([(iso_start, 1 - self_isolation),
+                                   (level2_start, 1 - level2),
+                                   (partial_start, 1 - partial_lockdown),
+                                   (full_start, 1 - full_lockdown)]).scaled(t0)
+
+
+@instrument.timed("load")
+def observed():
+    # NZ case data from Feb 28 (first confirmed case) through April, as days
+    # since Feb 28 and cumulative cases
+    days, cases = case_data.load().series("New Zealand", datetime.date(2020, 2, 28),
+                                          datetime.date(2020, 4, 30))
+    return days - case_data.day(datetime.date(2020, 2, 28)), cases
+
+
+def run(sims=sims, steps=steps, seed=seed, workers=workers, checkpoint=checkpoint):
+    """Runs the ensemble with the parameters above.
+
+    With checkpoint (a .npz path) the run is picked up from there, topped up to
+    sims and steps, and saved to it once a day. Returns the times in days and
+    the S, I, R RunningStats.
+    """
+    if checkpoint is None:
+        stats = Markov_ensemble.ensemble(N, I0, k, gamma, steps, sims, schedule, start_tick=t0,
+                                         seed=seed, mode=mode, epsilon=epsilon, workers=workers,
+                                         record=record)
+    else: # pick up where the checkpoint left off, topping it up to sims and steps
+        if os.path.exists(checkpoint):
+            ensemble = Markov_checkpoint.EnsembleRun.load(checkpoint)
+        else:
+            ensemble = Markov_checkpoint.EnsembleRun(N, I0, k, gamma, schedule, start_tick=t0,
+                                                     seed=seed, mode=mode, epsilon=epsilon,
+                                                     record=record)
+        if ensemble.sims < sims:
+            ensemble.add_replicates(sims - ensemble.sims, workers)
+        ensemble.run(steps, every=t0, path=checkpoint, workers=workers)
+        stats = ensemble.stats
+        return Markov_engine.tick_times(ensemble.tick, t0, ensemble.params["record"]), stats
+    return Markov_engine.tick_times(steps, t0, record), stats
+
+
+@instrument.timed("plot")
+def plot(t_arr, stats, dates, cases):
+    # simulated cases with a one standard deviation band against the data
+    import matplotlib.pyplot as plt
+    S_stats, I_stats, R_stats = stats
+    S_avg, I_avg, R_avg = S_stats.mean, I_stats.mean, R_stats.mean # averages
+
+    S_min, S_max = S_stats.band() # one standard deviation either side
+    I_min, I_max = I_stats.band()
+    R_min, R_max = R_stats.band()
         
-    S_avg.append(np.average(S_vals))
-    I_avg.append(np.average(I_vals))
-    R_avg.append(np.average(R_vals))
-    
-    S_dev.append(np.std(S_vals))
-    I_dev.append(np.std(I_vals))
-    R_dev.append(np.std(R_vals))
-    
-S_max = np.add(S_avg, S_dev)
-I_max = np.add(I_avg, I_dev)        
-R_max = np.add(R_avg, R_dev)
-
-S_min = np.subtract(S_avg, S_dev)
-I_min = np.subtract(I_avg, I_dev)        
-R_min = np.subtract(R_avg, R_dev)
-        
-#plt.plot(t_arr, S_avg, "b", label="susceptible")
-#plt.plot(t_arr, I_avg, "g", label="infected")
-#plt.plot(t_arr, R_avg, "r", label="recovered")
-plt.plot(t_arr, np.add(I_avg, R_avg), "y", label="simulated cases")
-plt.plot(dates, cases, "o", label="confirmed cases")
-
-#plt.fill_between(t_arr, S_max, S_min, facecolor="blue", alpha=0.5)
-#plt.fill_between(t_arr, I_max, I_min, facecolor="green", alpha=0.5)
-#plt.fill_between(t_arr, R_max, R_min, facecolor="red", alpha=0.5)
-plt.fill_between(t_arr, np.add(I_max, R_max), np.add(I_min, R_min), facecolor="yellow", alpha=0.5)
-
-plt.xlabel("time (days)")
-plt.ylabel("cases")
-plt.title("Total COVID-19 Cases in New Zealand")
-plt.legend()
-plt.show()
\ No newline at end of file
+    #plt.plot(t_arr, S_avg, "b", label="susceptible")
+    #plt.plot(t_arr, I_avg, "g", label="infected")
+    #plt.plot(t_arr, R_avg, "r", label="recovered")
+    plt.plot(t_arr, np.add(I_avg, R_avg), "y", label="simulated cases")
+    plt.plot(dates, cases, "o", label="confirmed cases")
+
+    #plt.fill_between(t_arr, S_max, S_min, facecolor="blue", alpha=0.5)
+    #plt.fill_between(t_arr, I_max, I_min, facecolor="green", alpha=0.5)
+    #plt.fill_between(t_arr, R_max, R_min, facecolor="red", alpha=0.5)
+    plt.fill_between(t_arr, np.add(I_max, R_max), np.add(I_min, R_min), facecolor="yellow", alpha=0.5)
+
+    plt.xlabel("time (days)")
+    plt.ylabel("cases")
+    plt.title("Total COVID-19 Cases in New Zealand")
+    plt.legend()
+    plt.show()
+
+
+if __name__ == "__main__":
+    t_arr, stats = run()
+    plot(t_arr, stats, *observed())
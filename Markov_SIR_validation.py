@@ -1,14 +1,14 @@
 # File : Markov_SIR_validation.py
 # Author : Jake Rugh
 # Date : May 18, 2020
-# Description : Use to confirm appropriate interval size.
+# Description : Use to confirm appropriate interval size for "tick" mode.
 # Note : step interval must be short enough so that only one transition can
 #   happen, i.e. the sum of chances of a recovery or infection must never
 #   exceed 100% for any step
 
-import matplotlib.pyplot as plt
-import random
 import numpy as np
+import instrument
+import Markov_engine
 
 # Only edit these parameters:
 #----------------------------------------------------
@@ -18,52 +18,36 @@ R0 = .311 * serial_interval # ratio of infections to recoveries
 N = 4886000 # total population
 I0 = 43 # amount of initially infected people
 steps = 150000
+record = t0 // 24 # steps between recorded states (hourly)
 #----------------------------------------------------
 
-gamma = 1 / serial_interval / t0 # rate of recovery
-k = R0 * gamma # rate of infection
-S = N - I0 # susceptible
-I = I0 # infected
-R = 0 # recovered
+k, gamma = Markov_engine.rates(R0, serial_interval, t0) # rates of infection/recovery
 
-S_arr = [S] # arrays of S,I,R,t values for plotting
-I_arr = [I]
-R_arr = [R]
 
-t_arr = [0]
-delta_I_arr = [] # testing purposes
-delta_R_arr = []
+def run(steps=steps, seed=None):
+    # one replicate's per-tick chances of an infection and of a recovery
+    S_arr, I_arr, R_arr = Markov_engine.simulate(N, I0, k, gamma, steps, 1, seed=seed,
+                                                 record=record)
+    S_arr, I_arr = S_arr[0], I_arr[0] # state going into the next step
 
-for n in range(0, steps):
-    delta_I = k * S * I / N # chance of infection
-    delta_R = gamma * I # chance of recovery
-    
-    delta_I_arr.append(delta_I) # testing purposes
-    delta_R_arr.append(delta_R)
-    
-    step = random.random() # picks random float between 0 and 1
-    
-    if step > 0 and step <= delta_I: # someone is infected
-        I += 1
-        S -= 1
-    elif step > delta_I and step <= delta_R + delta_I: # someone recovers
-        R += 1
-        I -= 1
-    else: # nothing happens
-        pass
-    
-    S_arr.append(S) # arrays for plotting
-    I_arr.append(I)
-    R_arr.append(R)
-    t_arr.append(t_arr[-1] + 1 / t0)
-    
-del t_arr[-1]
-    
-plt.plot(t_arr, delta_I_arr, "g", label="chance of infection") # testing purposes
-plt.plot(t_arr, delta_R_arr, "r", label="chance of recovery")
-plt.plot(t_arr, np.add(delta_I_arr, delta_R_arr), "y", label="sum of both")
-plt.xlabel("time (days)")
-plt.ylabel("probability")
+    t_arr = Markov_engine.tick_times(steps, t0, record)
+    delta_I_arr = k * S_arr * I_arr / N # chance of infection
+    delta_R_arr = gamma * I_arr # chance of recovery
+    return t_arr, delta_I_arr, delta_R_arr
 
-plt.legend()
-plt.show()
\ No newline at end of file
+
+@instrument.timed("plot")
+def plot(t_arr, delta_I_arr, delta_R_arr):
+    import matplotlib.pyplot as plt
+    plt.plot(t_arr, delta_I_arr, "g", label="chance of infection") # testing purposes
+    plt.plot(t_arr, delta_R_arr, "r", label="chance of recovery")
+    plt.plot(t_arr, np.add(delta_I_arr, delta_R_arr), "y", label="sum of both")
+    plt.xlabel("time (days)")
+    plt.ylabel("probability")
+
+    plt.legend()
+    plt.show()
+
+
+if __name__ == "__main__":
+    plot(*run())
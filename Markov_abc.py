@@ -0,0 +1,239 @@
+# File : Markov_abc.py
+# Date : Oct 18, 2026
+# Description : Approximate Bayesian computation (ABC-SMC) for Markov_SIR.py's
+#   R0 and lockdown fractions against New Zealand's confirmed cases. Each
+#   generation proposes particles around the last one's (or from the prior),
+#   runs them as one vectorized batch per worker and keeps those whose
+#   distance to the data is within the generation's tolerance. A particle is
+#   dropped as soon as its distance is certain to end up over the tolerance,
+#   so hopeless ones cost a few simulated days instead of a whole epidemic.
+# Note : the distance is the root mean square difference of log(1 + cases)
+#   on the observed days from the first with at least I0 cases (the model
+#   starts at I0 so it can't match the days before that)
+
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import instrument
+import Markov_engine
+import Markov_SIR
+
+PARAMS = ("R0", "self_isolation", "level2", "partial_lockdown", "full_lockdown")
+PRIOR = np.array([[0.5, 3.0], [0.0, 0.9], [0.0, 0.9], [0.0, 0.9], [0.0, 0.9]]) # uniform ranges
+
+# the intervention days of Markov_SIR.py, in days (in increasing order)
+STARTS = [Markov_SIR.iso_start, Markov_SIR.level2_start, Markov_SIR.partial_start,
+          Markov_SIR.full_start]
+
+
+def observations():
+    # ticks (from the start of the simulation) and log(1 + cases) of the
+    # observed days the distance is taken over
+    days, cases = Markov_SIR.observed()
+    used = cases >= Markov_SIR.I0
+    return days[used] * Markov_SIR.t0, np.log1p(cases[used])
+
+
+def distances(theta, tolerance=np.inf, seed=None, mode="tick", epsilon=0.03):
+    """Distance to the data of one Markov_SIR.py run per row of theta.
+
+    theta is a (particles, 5) array in the order of PARAMS; the lockdown
+    fractions replace each other on Markov_SIR.py's days. Runs stop once
+    their distance is sure to exceed tolerance and get inf. mode and epsilon
+    are as in Markov_engine.simulate ("tick" or "ssa" for the exact chain,
+    or "tau").
+    """
+    if mode not in ("tick", "ssa", "tau"):
+        raise ValueError("mode must be \"tick\", \"ssa\" or \"tau\"")
+    theta = np.atleast_2d(np.asarray(theta, dtype=np.float64))
+    sims = theta.shape[0]
+    rng = np.random.default_rng(seed)
+    t0, N, I0 = Markov_SIR.t0, Markov_SIR.N, Markov_SIR.I0
+    obs_ticks, log_obs = observations()
+    steps = int(obs_ticks[-1])
+    n_obs = obs_ticks.size
+
+    k, gamma = Markov_engine.rates(theta[:, 0], Markov_SIR.serial_interval, t0)
+    factors = np.column_stack([np.ones(sims), 1 - theta[:, 1:]])
+    # the ticks of the intervention days counted from the start of the run
+    # (tick t0), after j of which column j of factors applies, and every tick
+    # a run has to stop at (those and the observed days)
+    changes = np.array(STARTS) * t0 - t0
+    stops = np.union1d(changes[(changes > 0) & (changes < steps)], obs_ticks[obs_ticks > 0])
+
+    S = np.full(sims, N - I0, dtype=np.int64)
+    I = np.full(sims, I0, dtype=np.int64)
+    pos = np.zeros(sims)
+    seen = np.zeros(sims, dtype=np.int64) # observed days each run has passed
+    squares = np.zeros(sims) # sum of squared differences over those days
+    active = np.arange(sims)
+    out = np.full(sims, np.inf)
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        while active.size:
+            # record the runs that have got to their next observed day
+            due = pos >= obs_ticks[seen]
+            if due.any():
+                cases = np.log1p(N - S[due])
+                squares[due] += (cases - log_obs[seen[due]]) ** 2
+                seen[due] += 1
+                # cases only grow, so every later day already below them adds
+                # at least its gap to the final sum
+                later = np.arange(n_obs) >= seen[due][:, None]
+                gap = np.maximum(cases[:, None] - log_obs, 0) * later
+                bound = np.sqrt((squares[due] + np.sum(gap ** 2, axis=1)) / n_obs)
+                finished = seen[due] == n_obs
+                out[active[due][finished]] = np.sqrt(squares[due][finished] / n_obs)
+                drop = np.zeros(active.size, dtype=bool)
+                drop[due] = finished | (bound > tolerance)
+                if drop.any():
+                    keep = ~drop
+                    active, S, I, pos, seen, squares = (x[keep] for x in (active, S, I, pos,
+                                                                          seen, squares))
+                    k, factors = k[keep], factors[keep]
+                    if not active.size:
+                        break
+
+            u = 1 - rng.random(active.size)
+            v = rng.random(active.size)
+            factor = factors[np.arange(active.size), changes.searchsorted(pos, "right")]
+            a = (k * S * I / N * factor, gamma * I)
+            end = stops[stops.searchsorted(pos, "right")]
+            if mode == "tau":
+                X = np.stack([S, I, N - S - I])
+                pos, tick, fired = Markov_engine.tau_step(X, a, Markov_engine.SIR_CHANGE, pos,
+                                                          end, u, v, epsilon, rng)
+                n_inf, n_rec = fired
+            else:
+                pos, tick, chosen = Markov_engine.event_step(a, pos, end, u, v, mode)
+                n_inf = chosen == 0
+                n_rec = chosen == 1
+            S -= n_inf
+            I += n_inf
+            I -= n_rec
+    if instrument.enabled():
+        instrument.count(particles=sims, pruned=np.count_nonzero(np.isinf(out)))
+    return out
+
+
+def _batch(theta, seed, tolerance, mode, epsilon):
+    return distances(theta, tolerance, seed, mode, epsilon)
+
+
+def _map(theta, tolerance, seeds, batch, mode, epsilon, pool):
+    # distances of every row of theta, batch rows at a time, in pool if given
+    chunks = [theta[a:a + batch] for a in range(0, theta.shape[0], batch)]
+    n = len(chunks)
+    args = (chunks, seeds.spawn(n), [tolerance] * n, [mode] * n, [epsilon] * n)
+    func = instrument.worker(_batch)
+    with instrument.phase("simulate"):
+        results = list(map(func, *args) if pool is None else pool.map(func, *args))
+    return np.concatenate(instrument.gather(results))
+
+
+def _in_prior(theta):
+    return np.all((theta >= PRIOR[:, 0]) & (theta <= PRIOR[:, 1]), axis=1)
+
+
+def _kernel(new, old, cov):
+    # Gaussian perturbation kernel density (up to a constant) of every new
+    # particle around every old one
+    inverse = np.linalg.inv(cov)
+    diff = new[:, None, :] - old[None, :, :]
+    return np.exp(-0.5 * np.einsum("ijk,kl,ijl->ij", diff, inverse, diff))
+
+
+def abc_smc(particles=1000, generations=8, first=1.0, final=0.0, quantile=0.5, batch=250,
+            seed=None, workers=None, mode="tick", epsilon=0.03, min_acceptance=0.01):
+    """Posterior samples of PARAMS by ABC-SMC (Beaumont et al. 2009).
+
+    The first generation draws from the uniform PRIOR and keeps particles
+    within tolerance first. Each later generation's tolerance is the quantile
+    of the last one's distances, and its particles are drawn from the last
+    one's by weight and moved by a Gaussian with twice their weighted
+    covariance. It stops after generations generations, once the tolerance
+    gets to final, or when fewer than min_acceptance of the proposals would
+    be accepted (that generation is then abandoned). Proposals are simulated
+    batch at a time across workers processes (1 runs here).
+
+    Returns a dict with the particles (particles, 5) in the order of PARAMS,
+    their normalized weights and distances, and the tolerance, proposals
+    simulated and acceptance rate of every finished generation.
+    """
+    seeds = np.random.SeedSequence(seed)
+    rng = np.random.default_rng(seeds.spawn(1)[0])
+    pool = None if workers == 1 else ProcessPoolExecutor(max_workers=workers)
+    result = {"params": PARAMS, "tolerances": [], "simulations": [], "acceptance": []}
+    theta = weights = dist = None
+    tolerance = first
+    try:
+        for generation in range(generations):
+            if theta is not None:
+                tolerance = max(np.quantile(dist, quantile), final)
+                cov = 2 * np.atleast_2d(np.cov(theta.T, aweights=weights))
+            kept, kept_dist = [], []
+            accepted = simulated = 0
+            rate = 1.0
+            while accepted < particles:
+                size = int(min(max(batch, (particles - accepted) / rate * 1.1), 20 * particles))
+                if theta is None:
+                    proposal = rng.uniform(PRIOR[:, 0], PRIOR[:, 1], (size, len(PARAMS)))
+                else:
+                    proposal = np.empty((0, len(PARAMS)))
+                    while proposal.shape[0] < size:
+                        moved = theta[rng.choice(theta.shape[0], size, p=weights)]
+                        moved += rng.multivariate_normal(np.zeros(len(PARAMS)), cov, size)
+                        proposal = np.concatenate([proposal, moved[_in_prior(moved)]])
+                    proposal = proposal[:size]
+                d = _map(proposal, tolerance, seeds, batch, mode, epsilon, pool)
+                ok = d <= tolerance
+                kept.append(proposal[ok])
+                kept_dist.append(d[ok])
+                accepted += np.count_nonzero(ok)
+                simulated += size
+                rate = max(accepted / simulated, 1 / simulated)
+                if simulated >= particles / min_acceptance and rate < min_acceptance:
+                    break
+            if accepted < particles:
+                break
+
+            new = np.concatenate(kept)[:particles]
+            new_dist = np.concatenate(kept_dist)[:particles]
+            if theta is None:
+                new_weights = np.ones(particles)
+            else:
+                new_weights = 1 / (_kernel(new, theta, cov) @ weights)
+            theta, weights, dist = new, new_weights / new_weights.sum(), new_dist
+            result["tolerances"].append(tolerance)
+            result["simulations"].append(simulated)
+            result["acceptance"].append(accepted / simulated)
+            if tolerance <= final:
+                break
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    result.update(particles=theta, weights=weights, distances=dist)
+    return result
+
+
+def summary(result):
+    # weighted posterior mean, standard deviation and 95% interval of each parameter
+    for generation, (tolerance, simulated, rate) in enumerate(zip(result["tolerances"],
+                                                                  result["simulations"],
+                                                                  result["acceptance"])):
+        print("generation", generation, ": tolerance", round(tolerance, 4), ",", simulated,
+              "simulated, acceptance", round(rate, 3))
+    theta, weights = result["particles"], result["weights"]
+    if theta is None:
+        print("no generation finished, try a larger first tolerance")
+        return
+    for name, values in zip(result["params"], theta.T):
+        mean = np.sum(weights * values)
+        std = np.sqrt(np.sum(weights * (values - mean) ** 2))
+        order = np.argsort(values)
+        cdf = np.cumsum(weights[order])
+        low, high = values[order][np.searchsorted(cdf, [0.025, 0.975])]
+        print(name, "=", mean, "+/-", std, " 95% interval: [", low, ",", high, "]")
+
+
+if __name__ == "__main__":
+    summary(abc_smc())
@@ -0,0 +1,197 @@
+# File : Markov_checkpoint.py
+# Date : Oct 18, 2026
+# Description : Long Markov SIR ensembles that can be stopped and picked up
+#   again. An EnsembleRun keeps the current S, I, R of every replicate, the
+#   random generator state of every batch and the RunningStats gathered so
+#   far, and saves all of it to a compressed .npz. A saved run can be resumed,
+#   extended with more replicates or more ticks, or forked at its current tick
+#   into several intervention scenarios without recomputing the history.
+# Note : a run advanced in different sized chunks is equally valid but not
+#   bit-for-bit the same, since waits in progress are redrawn at chunk ends
+
+from concurrent.futures import ProcessPoolExecutor
+import copy
+import json
+import os
+import numpy as np
+import instrument
+import Markov_engine
+from Markov_ensemble import RunningStats
+
+_ENGINE_PARAMS = ("N", "I0", "k", "gamma", "schedule", "mode", "epsilon")
+
+
+def _advance(batch, ticks, params, tick):
+    # runs one batch for ticks more ticks from its saved state, recording the
+    # grid ticks past tick and the last one (to carry on from)
+    grid = Markov_engine.record_grid(ticks, params["record"], tick, first=1, last=True)
+    trajectories = Markov_engine.simulate(steps=ticks, sims=batch["S"].size, seed=batch["rng"],
+                                          start_tick=params["start_tick"] + tick,
+                                          initial=(batch["S"], batch["I"], batch["R"]),
+                                          record=grid,
+                                          **{key: params[key] for key in _ENGINE_PARAMS})
+    stats = []
+    for X in trajectories:
+        stat = RunningStats(grid.size)
+        stat.update(X)
+        stats.append(stat)
+    S, I, R = trajectories
+    batch = dict(batch, S=S[:, -1], I=I[:, -1], R=R[:, -1])
+    return batch, stats
+
+
+class EnsembleRun:
+    """A resumable ensemble of Markov SIR replicates.
+
+    Replicates come in batches of batch, each with its own generator spawned
+    from seed, so more replicates can be added later without changing the
+    existing ones. tick is how many ticks every replicate has been run for and
+    stats holds the (S, I, R) RunningStats over every record-th tick from 0 to
+    tick and at tick itself, the grid of Markov_engine.tick_times(tick, t0,
+    record).
+    """
+
+    def __init__(self, N, I0, k, gamma, schedule=(), start_tick=0, seed=None, mode="tick",
+                 epsilon=0.03, batch=25, record=1):
+        self.params = dict(N=N, I0=I0, k=k, gamma=gamma, schedule=[list(p) for p in schedule],
+                           start_tick=start_tick, mode=mode, epsilon=epsilon, batch=batch,
+                           record=record)
+        self.entropy = np.random.SeedSequence(seed).entropy
+        self.batches = []
+        self.tick = 0
+        self.stats = [RunningStats(1) for n in range(3)]
+
+    @property
+    def sims(self):
+        return sum(batch["S"].size for batch in self.batches)
+
+    def add_replicates(self, sims, workers=1):
+        # adds sims replicates (in whole batches) and runs them up to self.tick
+        size = self.params["batch"]
+        new = []
+        for a in range(0, sims, size):
+            seed = np.random.SeedSequence(self.entropy, spawn_key=(len(self.batches) + len(new),))
+            n = min(size, sims - a)
+            I0 = self.params["I0"]
+            new.append({"S": np.full(n, self.params["N"] - I0), "I": np.full(n, I0),
+                        "R": np.zeros(n, dtype=np.int64), "rng": np.random.default_rng(seed)})
+
+        stats = [RunningStats(1) for n in range(3)]
+        for batch in new:
+            for stat, X in zip(stats, (batch["S"], batch["I"], batch["R"])):
+                stat.update(X[:, None])
+        if self.tick:
+            results = self._map(new, self.tick, 0, workers)
+            new = [batch for batch, _ in results]
+            for n in range(3):
+                history = RunningStats(results[0][1][n].mean.size)
+                for _, batch_stats in results:
+                    history.merge(batch_stats[n])
+                stats[n].extend(history)
+
+        if self.batches:
+            for stat, other in zip(self.stats, stats):
+                stat.merge(other)
+        else:
+            self.stats = stats
+        self.batches.extend(new)
+
+    def advance(self, ticks, workers=1):
+        # runs every replicate ticks further and extends the statistics
+        if ticks <= 0 or not self.batches:
+            return
+        results = self._map(self.batches, ticks, self.tick, workers)
+        self.batches = [batch for batch, _ in results]
+        with instrument.phase("aggregate"):
+            if self.tick % self.params["record"]: # the last column was only the end of the run
+                for stat in self.stats:
+                    stat.truncate(stat.mean.size - 1)
+            for n in range(3):
+                segment = RunningStats(results[0][1][n].mean.size)
+                for _, batch_stats in results:
+                    segment.merge(batch_stats[n])
+                self.stats[n].extend(segment)
+        self.tick += ticks
+
+    def run(self, until, every=None, path=None, workers=1):
+        # advances to tick until in chunks of every ticks, saving to path after each
+        # (and once at the end, so added replicates are kept too)
+        every = every or max(until - self.tick, 1)
+        pool = None if workers == 1 else ProcessPoolExecutor(max_workers=workers)
+        try:
+            while self.tick < until:
+                self.advance(min(every, until - self.tick), pool or 1)
+                if path is not None:
+                    self.save(path)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        if path is not None:
+            self.save(path)
+
+    def fork(self, scenarios):
+        """Copies of this run, one per scenario, that continue from this tick.
+
+        Each scenario is a list of (tick, factor) pairs added to the schedule.
+        The copies keep the current generator states, so they go on with common
+        random numbers.
+        """
+        forks = []
+        for scenario in scenarios:
+            run = copy.deepcopy(self)
+            run.params["schedule"] = self.params["schedule"] + [list(p) for p in scenario]
+            forks.append(run)
+        return forks
+
+    def save(self, path):
+        # writes everything needed to resume to a compressed .npz (atomically)
+        arrays = {"params": json.dumps(self.params), "entropy": str(self.entropy),
+                  "tick": self.tick, "sizes": [batch["S"].size for batch in self.batches],
+                  "rng": json.dumps([batch["rng"].bit_generator.state for batch in self.batches])}
+        for name in "SIR":
+            arrays[name] = np.concatenate([batch[name] for batch in self.batches] or [[]])
+        for name, stat in zip("SIR", self.stats):
+            arrays[name + "_count"] = stat.count
+            for field in ("mean", "m2", "min", "max"):
+                arrays[name + "_" + field] = getattr(stat, field)
+        temporary = path + ".tmp.npz"
+        np.savez_compressed(temporary, **arrays)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        # picks a saved run back up
+        with np.load(path) as saved:
+            params = json.loads(str(saved["params"]))
+            run = cls(**params)
+            run.entropy = int(str(saved["entropy"]))
+            run.tick = int(saved["tick"])
+            states = json.loads(str(saved["rng"]))
+            bounds = np.cumsum(np.concatenate([[0], saved["sizes"]])).astype(int)
+            for n, state in enumerate(states):
+                generator = np.random.default_rng()
+                generator.bit_generator.state = state
+                rows = slice(bounds[n], bounds[n + 1])
+                run.batches.append({"S": saved["S"][rows].astype(np.int64),
+                                    "I": saved["I"][rows].astype(np.int64),
+                                    "R": saved["R"][rows].astype(np.int64), "rng": generator})
+            for name, stat in zip("SIR", run.stats):
+                stat.count = int(saved[name + "_count"])
+                for field in ("mean", "m2", "min", "max"):
+                    setattr(stat, field, saved[name + "_" + field])
+        return run
+
+    def _map(self, batches, ticks, tick, workers):
+        # workers is a process count (1 runs here) or an already open pool
+        n = len(batches)
+        args = (batches, [ticks] * n, [self.params] * n, [tick] * n)
+        func = instrument.worker(_advance)
+        with instrument.phase("simulate"):
+            if workers == 1:
+                results = list(map(func, *args))
+            elif isinstance(workers, ProcessPoolExecutor):
+                results = list(workers.map(func, *args))
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    results = list(pool.map(func, *args))
+        return instrument.gather(results)
@@ -0,0 +1,450 @@
+# File : Markov_engine.py
+# Date : Oct 18, 2026
+# Description : Vectorized batch engine for the Markov SIR simulations. Every
+#   replicate is advanced together as NumPy arrays instead of ticking each one
+#   through a Python loop, and random numbers are drawn in bulk blocks.
+# Note : this is the same chain the scripts step through one tick at a time:
+#   on each tick someone is infected with chance delta_I, someone recovers with
+#   chance delta_R, otherwise nothing happens. Those chances only change when
+#   an event fires or the quarantine level changes, so the run of empty ticks
+#   before the next event is geometrically distributed and is drawn in one go.
+#   "hybrid" mode only runs the chain while few are infected: replicates with
+#   at least THRESHOLD infected follow the mean-field ODE instead, in steps of
+#   many ticks, and go back to the chain if the infected fall below half that.
+#   The loop itself (run_chain) works on any set of transitions and is the
+#   one compartments.Model.simulate runs its models on; simulate is SIR on it.
+
+import numpy as np
+import instrument
+import interventions
+
+MODES = ("tick", "ssa", "tau", "hybrid")
+THRESHOLD = 1000 # infected above which "hybrid" mode integrates the ODE
+
+
+def rates(R0, serial_interval, t0):
+    # per-tick rates of infection (k) and recovery (gamma)
+    gamma = 1 / serial_interval / t0
+    return R0 * gamma, gamma
+
+
+def tick_times(steps, t0, every=1):
+    # time in days of each state recorded every every ticks (index 0 is the
+    # initial state, the last one the state after steps ticks), worked out
+    # from the tick counts rather than accumulated
+    return output_grid(steps, every) / t0
+
+
+def record_grid(steps, every=1, start=0, first=0, last=False):
+    # local ticks from first to steps whose tick counted from start is a
+    # multiple of every, i.e. where a run picked up at tick start records,
+    # with steps added at the end if last (where the whole run ends)
+    grid = np.arange(first + (-(start + first)) % every, steps + 1, every, dtype=np.int64)
+    if last and steps >= first and (grid.size == 0 or grid[-1] != steps):
+        grid = np.append(grid, steps)
+    return grid
+
+
+def output_grid(steps, record=None):
+    # the ticks simulate records at for its record argument, always ending
+    # with steps
+    if record is None:
+        record = 1
+    if np.ndim(record) == 0:
+        return record_grid(steps, int(record), last=True)
+    return np.union1d(np.clip(np.asarray(record, dtype=np.int64), 0, steps), [steps])
+
+
+def segments(schedule, start_tick, steps):
+    # the local ticks where the infection multiplier changes, the multiplier of
+    # each segment and where it ends (see interventions.Schedule.local)
+    return interventions.Schedule.of(schedule).local(start_tick, steps)
+
+
+SIR_CHANGE = np.array([[-1, 1, 0], [0, -1, 1]]) # infection, recovery on S, I, R
+
+
+def simulate(N, I0, k, gamma, steps, sims, schedule=(), start_tick=0, seed=None, block=1024,
+             mode="tick", epsilon=0.03, initial=None, record=None, threshold=THRESHOLD):
+    """Runs sims replicates of the Markov SIR model.
+
+    schedule is an interventions.Schedule or a list of (tick, factor) pairs:
+    from that tick on the chance of infection is multiplied by factor. Ticks
+    are counted from start_tick, so the scripts that loop over
+    range(t0, steps + t0) pass start_tick=t0.
+
+    mode picks how the replicates are advanced:
+      "tick" - the tick-based chain the scripts used (one event per tick at most)
+      "ssa"  - Gillespie's direct method, k and gamma taken as rates per tick
+      "tau"  - adaptive tau-leaping; epsilon bounds the relative change in S
+               and I allowed in one leap, smaller is more accurate but slower
+      "hybrid" - the "tick" chain while a replicate has fewer than threshold
+               infected, and above that the deterministic SIR ODE (RK4 in
+               steps over which I changes by at most epsilon of itself),
+               rounded to whole people. A replicate goes back to the chain
+               once fewer than threshold / 2 are infected. This keeps the
+               chance variation of the early epidemic, where it matters, at
+               about the cost of the ODE for the rest of it
+
+    initial can give each replicate its own starting (S, I, R), e.g. the last
+    column of an earlier run continued from start_tick; I0 is then ignored.
+    Replicates given the same seed draw the same random numbers round by round,
+    so runs that differ only in schedule use common random numbers.
+
+    record picks the output grid: None keeps the state after every tick, an int
+    every record ticks (0, record, 2 * record, ...), and an array of ticks
+    those ticks (e.g. np.round(days * t0) for given day times). The state after
+    the last tick is always recorded too, as the last column. Memory goes with
+    the size of the grid (plus one block of rounds), not with the number of
+    ticks.
+
+    Returns S, I, R as (sims, len(grid)) arrays, where column j is the state
+    after grid[j] ticks; with record=None that is (sims, steps + 1).
+    """
+    if initial is None:
+        initial = (N - I0, I0, 0)
+    X0 = np.stack([np.broadcast_to(np.asarray(x, dtype=np.int64), (sims,)) for x in initial])
+
+    def propensities(X, factor):
+        S, I = X[0], X[1]
+        return k * S * I / N * factor, gamma * I # chances of infection, recovery
+
+    hybrid = None
+    if mode == "hybrid":
+        hybrid = _Hybrid(X0.sum(axis=0), k, gamma, N, threshold, epsilon)
+    S, I, R = run_chain(X0, propensities, SIR_CHANGE, steps, schedule, start_tick, seed, block,
+                        mode, epsilon, record, hybrid)
+    if instrument.enabled():
+        _count(X0, S[:, -1], I[:, -1], steps, mode)
+        if hybrid is not None:
+            instrument.count(ode_steps=hybrid.steps)
+    return S, I, R
+
+
+def run_chain(X0, propensities, change, steps, schedule=(), start_tick=0, seed=None, block=1024,
+              mode="tick", epsilon=0.03, record=None, hybrid=None):
+    """The event loop every Markov model here runs on, for any transitions.
+
+    X0 is the (compartments, sims) starting counts and change the
+    (transitions, compartments) stoichiometry, change[j] being what
+    transition j adds to each compartment. propensities(X, factor) gives the
+    chances per tick of every transition in state X (a (transitions, sims)
+    array or a list of rows), factor being each replicate's schedule factor. schedule, start_tick,
+    seed, block, mode, epsilon and record are as in simulate; "hybrid" mode
+    needs hybrid, an object whose step(X, a, pos, end, u, v, factor) advances
+    the replicates one round like the step functions below.
+
+    Returns the counts as a (compartments, sims, len(grid)) int32 array.
+    """
+    if mode not in MODES:
+        raise ValueError("mode must be one of " + ", ".join(MODES))
+    if mode == "hybrid" and hybrid is None:
+        raise ValueError("\"hybrid\" mode needs a model that has it (Markov_engine.simulate)")
+    rng = np.random.default_rng(seed)
+    bounds, factors, ends = segments(schedule, start_tick, steps)
+    grid = output_grid(steps, record)
+
+    X0 = np.asarray(X0, dtype=np.int64)
+    X = X0.copy()
+    width, sims = X.shape
+    # what each transition does to X, with a column of zeros at the end for
+    # replicates where nothing fired (index -1)
+    moves = np.hstack([change.T, np.zeros((width, 1), dtype=np.int64)])
+    index_type = np.int8 if change.shape[0] < 128 else np.int64
+    pos = np.zeros(sims) # time (in ticks) each replicate has been run up to
+
+    # tick of each round's transitions and which fired (an index per
+    # replicate, or counts of every transition when leaping), added into the
+    # grid columns of totals after every block of rounds
+    events = []
+    columns = grid.size + 1
+    totals = np.zeros((width, sims * columns), dtype=np.int64)
+    fired_count = rounds = 0
+
+    row = block
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        while pos.min() < steps:
+            if row == block: # bin the last block and draw the next block of random numbers
+                fired_count += _bin(totals, change, steps, events, grid)
+                rounds += len(events)
+                events = []
+                wait_draws = 1 - rng.random((block, sims)) # in (0, 1]
+                kind_draws = rng.random((block, sims))
+                row = 0
+            u = wait_draws[row]
+            v = kind_draws[row]
+            row += 1
+
+            seg = bounds.searchsorted(pos, "right")
+            factor = factors[seg]
+            end = ends[seg]
+            a = propensities(X, factor)
+            if mode == "tau":
+                pos, tick, fired = tau_step(X, a, change, pos, end, u, v, epsilon, rng)
+            elif mode == "hybrid":
+                pos, tick, fired = hybrid.step(X, a, pos, end, u, v, factor)
+            else:
+                pos, tick, fired = event_step(a, pos, end, u, v, mode)
+            if fired.ndim == 1:
+                X += moves[:, fired]
+                fired = fired.astype(index_type) # kept until the block is binned, so keep it small
+            else:
+                X += change.T @ fired
+            events.append((tick, fired))
+    fired_count += _bin(totals, change, steps, events, grid)
+    rounds += len(events)
+
+    if instrument.enabled():
+        instrument.count(replicates=sims, ticks=steps * sims, events=fired_count, rounds=rounds)
+    return _trajectories(X0, totals, grid)
+
+
+def _count(X0, S, I, steps, mode):
+    # the SIR counters of a finished run, from its start and end states
+    infections = int(np.sum(X0[0] - S))
+    instrument.count(infections=infections, extinctions=np.count_nonzero(I == 0))
+    if mode == "tick": # at most one event a tick, the rest are empty
+        events = 2 * infections - int(np.sum(I - X0[1])) # every infection, every recovery
+        instrument.count(noop_ticks=steps * S.size - events)
+
+
+def event_step(a, pos, end, u, v, mode):
+    # one transition after a wait: a geometric number of empty ticks in
+    # "tick" mode, an exponential time in "ssa" mode. a holds the chances of
+    # every transition, as a (transitions, sims) array or a list of rows (the
+    # rows are summed one by one, which is faster for a few transitions).
+    # Returns the new positions, the tick each transition fired on and its
+    # index (-1 for replicates that only got to the end of their segment).
+    # Models that keep their own loop (Markov_abc) step with it directly
+    total = a[0]
+    for row in a[1:]:
+        total = total + row
+    if mode == "tick":
+        # a tick can't hold more than one event, so the chances saturate at 1
+        total = np.minimum(total, 1)
+        # number of empty ticks before the next event (inf if nothing can happen)
+        event_tick = pos + np.floor(np.log(u) / np.log1p(-total))
+        fired = event_tick < end
+        # replicates whose next event falls past the end of the segment just
+        # skip ahead to it, the wait is memoryless so it is redrawn from there
+        tick = np.where(fired, event_tick, end).astype(np.int64)
+        new_pos = tick + fired
+    else:
+        event_time = pos - np.log(u) / total
+        fired = event_time < end
+        new_pos = np.where(fired, event_time, end)
+        tick = np.floor(new_pos).astype(np.int64)
+    # first transition whose cumulative chance passes v * total
+    x = v * total
+    cumulative = a[0]
+    chosen = cumulative <= x # True picks transition 1, while there are only two
+    if len(a) == 1:
+        chosen = 0
+    elif len(a) > 2:
+        chosen = chosen.astype(np.int64)
+        for row in a[1:-1]:
+            cumulative = cumulative + row
+            chosen += cumulative <= x
+    return new_pos, tick, np.where(fired, chosen, -1)
+
+
+def tau_step(X, a, change, pos, end, u, v, epsilon, rng):
+    # leaps as long as the expected change in every compartment stays within
+    # epsilon of its size (Cao, Gillespie and Petzold's tau selection), and
+    # fires a single Gillespie event instead where a leap would only cover a
+    # few transitions or would take a compartment below zero. Returns the new
+    # positions, ticks and (transitions, sims) counts of what fired
+    new_pos, tick, chosen = event_step(a, pos, end, u, v, "ssa")
+    a = np.asarray(a)
+    counts = (chosen == np.arange(a.shape[0])[:, None]).astype(np.int64)
+    total = a.sum(axis=0)
+    mean = change.T @ a
+    variance = (change * change).T @ a
+    limit = np.maximum(epsilon * X / 2, 1)
+    tau = np.minimum(limit / np.abs(mean), limit * limit / variance).min(axis=0)
+    leap = np.flatnonzero((tau >= 10 / total) & (total > 0))
+    if not leap.size:
+        return new_pos, tick, counts
+
+    span = np.minimum(pos[leap] + tau[leap], end[leap]) - pos[leap]
+    leaped = rng.poisson(a[:, leap] * span)
+    ok = (X[:, leap] + change.T @ leaped >= 0).all(axis=0)
+    leap, span = leap[ok], span[ok]
+    counts[:, leap] = leaped[:, ok]
+    new_pos[leap] = pos[leap] + span
+    # the leap's transitions all show up in the tick it ends in
+    tick[leap] = np.ceil(new_pos[leap]).astype(np.int64) - 1
+    return new_pos, tick, counts
+
+
+class _Hybrid:
+    """State of a "hybrid" run between rounds: which replicates are on the ODE
+    and their exact (unrounded) S and I.
+
+    Each round the replicates on the chain fire one event as in "tick" mode
+    and those on the ODE take one RK4 step. The ODE's S and R are rounded to
+    whole people, so its infections and recoveries are counts like the
+    chain's and add up to the unrounded totals.
+    """
+
+    def __init__(self, n, k, gamma, N, threshold, epsilon):
+        self.n = n # everyone in each replicate, S + I + R
+        self.k = k
+        self.gamma = gamma
+        self.N = N
+        self.threshold = threshold
+        self.epsilon = epsilon
+        self.ode = np.zeros(n.size, dtype=bool)
+        self.s = np.zeros(n.size)
+        self.i = np.zeros(n.size)
+        self.steps = 0 # ODE steps taken, over every replicate
+
+    def step(self, X, a, pos, end, u, v, factor):
+        # returns what fired like event_step while every replicate is on the
+        # chain, and counts like tau_step once some are on the ODE
+        new_pos, tick, chosen = event_step(a, pos, end, u, v, "tick")
+        S, I = X[0], X[1]
+        if I.max() < self.threshold and not self.ode.any(): # all on the chain
+            return new_pos, tick, chosen
+        enter = ~self.ode & (I >= self.threshold)
+        self.s[enter] = S[enter]
+        self.i[enter] = I[enter]
+        self.ode[enter] = True
+        self.ode[self.ode & (I < self.threshold / 2)] = False
+        on = np.flatnonzero(self.ode & (pos < end))
+        if not on.size:
+            return new_pos, tick, chosen
+
+        counts = np.stack([chosen == 0, chosen == 1]).astype(np.int64)
+        self.steps += on.size
+        # chance of infection per susceptible and infected per tick
+        beta = self.k * factor / self.N
+        beta = beta if np.ndim(beta) == 0 else beta[on]
+        gamma = self.gamma if np.ndim(self.gamma) == 0 else self.gamma[on]
+        # I grows by at most (beta * N + gamma) * I a tick
+        span = np.maximum(np.floor(self.epsilon / (beta * self.N + gamma)), 1)
+        reached = np.minimum(pos[on] + span, end[on])
+        s, i = _rk4(self.s[on], self.i[on], beta, gamma, reached - pos[on])
+        self.s[on], self.i[on] = s, i
+        n = self.n[on]
+        S_new = np.round(s).astype(np.int64)
+        R_new = np.round(n - s - i).astype(np.int64)
+        counts[0, on] = np.maximum(S[on] - S_new, 0)
+        counts[1, on] = np.clip(R_new - (n - S[on] - I[on]), 0, I[on] + counts[0, on])
+        new_pos[on] = reached
+        tick[on] = np.ceil(reached).astype(np.int64) - 1 # shows up at the end of the step
+        return new_pos, tick, counts
+
+
+def _rk4(s, i, beta, gamma, h):
+    # one classic RK4 step of h ticks of dS = -beta S I, dI = beta S I - gamma I
+    def derivative(s, i):
+        infections = beta * s * i
+        return -infections, infections - gamma * i
+    s1, i1 = derivative(s, i)
+    s2, i2 = derivative(s + 0.5 * h * s1, i + 0.5 * h * i1)
+    s3, i3 = derivative(s + 0.5 * h * s2, i + 0.5 * h * i2)
+    s4, i4 = derivative(s + h * s3, i + h * i3)
+    return s + h / 6 * (s1 + 2 * s2 + 2 * s3 + s4), i + h / 6 * (i1 + 2 * i2 + 2 * i3 + i4)
+
+
+def _bin(totals, change, steps, events, grid):
+    # adds the transitions of events to totals, the (compartments, sims *
+    # (len(grid) + 1)) change of every replicate within each grid column. A
+    # transition on tick t shows up in the state after t + 1 ticks, so it is
+    # counted in the first grid column at or past t + 1 (transitions past the
+    # last one land in a spare column that is dropped). Rounds can give the
+    # index of what fired or counts of every transition. Returns how many
+    # transitions fired
+    width = totals.shape[0]
+    sims = events[0][0].size if events else 0
+    columns = grid.size + 1
+    offset = np.arange(sims)[:, None] * columns
+    fired_count = 0
+    for counted in (False, True):
+        rounds = [e for e in events if (e[1].ndim == 2) == counted]
+        if not rounds:
+            continue
+        ticks = np.stack([e[0] for e in rounds], axis=1)
+        cells = grid.searchsorted(np.minimum(ticks, steps) + 1) + offset
+        if not counted:
+            fired = np.stack([e[1] for e in rounds], axis=1)
+            keep = fired >= 0
+            cells, delta = cells[keep], change[fired[keep]].T
+            fired_count += cells.size
+        else: # (transitions, sims) per round
+            fired = np.stack([e[1] for e in rounds], axis=2)
+            delta = np.tensordot(change, fired, axes=(0, 0)).reshape(width, -1)
+            cells = cells.ravel()
+            fired_count += int(fired.sum())
+        for c in range(width):
+            if np.any(delta[c]):
+                np.add.at(totals[c], cells, delta[c])
+    return fired_count
+
+
+def _trajectories(X0, totals, grid):
+    # the counts recorded at the grid ticks, from X0 and the binned totals
+    width, sims = X0.shape
+    out = np.empty((width, sims, grid.size), dtype=np.int32)
+    for c in range(width):
+        count = totals[c].reshape(sims, grid.size + 1)[:, :-1]
+        np.cumsum(count, axis=1, out=out[c], dtype=np.int32)
+        out[c] += X0[c, :, None].astype(np.int32)
+    return out
+
+
+def first_passage(N, I0, k, gamma, target, steps, sims, schedule=(), start_tick=0, seed=None,
+                  mode="tick"):
+    """Runs replicates only until I + R first reaches target.
+
+    A replicate stops as soon as it reaches target, dies out (I = 0) or runs
+    out of steps, and is dropped from the batch, so the cost is the number of
+    events up to the passage. mode is "tick" or "ssa" as in simulate (tau-leaping
+    could jump past target).
+
+    Returns (ticks, extinct): the tick on which each replicate reached target
+    (nan if it never did) and whether it died out first.
+    """
+    if mode not in ("tick", "ssa"):
+        raise ValueError("first_passage mode must be \"tick\" or \"ssa\"")
+    rng = np.random.default_rng(seed)
+    bounds, factors, ends = segments(schedule, start_tick, steps)
+
+    ticks = np.full(sims, np.nan)
+    extinct = np.zeros(sims, dtype=bool)
+    if I0 >= target:
+        ticks[:] = 0
+        return ticks, extinct
+
+    S = np.full(sims, N - I0, dtype=np.int64)
+    I = np.full(sims, I0, dtype=np.int64)
+    pos = np.zeros(sims)
+    active = np.arange(sims)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        while active.size:
+            u = 1 - rng.random(active.size)
+            v = rng.random(active.size)
+            seg = bounds.searchsorted(pos, "right")
+            a = (k * S * I / N * factors[seg], gamma * I)
+            pos, tick, chosen = event_step(a, pos, ends[seg], u, v, mode)
+            infected = chosen == 0
+            recovered = chosen == 1
+
+            S -= infected
+            I += infected
+            I -= recovered
+
+            # I + R only grows through infections, so it reaches target exactly
+            hit = N - S >= target
+            died = I == 0
+            ticks[active[hit]] = tick[hit]
+            extinct[active[died]] = True
+            keep = ~(hit | died) & (pos < steps)
+            active, S, I, pos = active[keep], S[keep], I[keep], pos[keep]
+
+    if instrument.enabled():
+        instrument.count(replicates=sims, extinctions=np.count_nonzero(extinct),
+                         passages=np.count_nonzero(~np.isnan(ticks)))
+    return ticks, extinct
@@ -0,0 +1,250 @@
+# File : Markov_ensemble.py
+# Date : Oct 18, 2026
+# Description : Runs the replicates of a Markov SIR ensemble on a pool of
+#   worker processes. Replicates are split into fixed-size batches and every
+#   batch gets its own random stream spawned from one seed, so the results are
+#   the same no matter how many workers are used. Workers only send back
+#   per-timepoint statistics (RunningStats), never the full trajectories.
+# Note : scripts that use a pool must keep their work under
+#   if __name__ == "__main__": so the workers can import them safely
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+import instrument
+import Markov_engine
+import result_cache
+
+# modules whose source the cached ensembles depend on (see result_cache)
+SOURCES = ("Markov_ensemble", "Markov_engine", "interventions")
+
+
+def map_batches(func, sims, seed=None, batch=25, workers=None):
+    """Calls func(size, seed) for every batch of replicates, in parallel.
+
+    sims replicates are split into batches of at most batch replicates, each
+    given its own numpy SeedSequence spawned from seed. func must be picklable
+    (a module-level function or a functools.partial of one). Results come back
+    in batch order. workers=1 runs everything in this process, workers=None
+    uses every core.
+    """
+    sizes = [min(batch, sims - a) for a in range(0, sims, batch)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    func = instrument.worker(func)
+    with instrument.phase("simulate"):
+        if workers == 1:
+            results = list(map(func, sizes, seeds))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(func, sizes, seeds))
+    return instrument.gather(results)
+
+
+class RunningStats:
+    """Per-timepoint mean and standard deviation, updated one batch at a time.
+
+    Only O(timepoints) numbers are kept no matter how many replicates go in:
+    the count, mean and sum of squared deviations (Welford's method, with
+    Chan's rule to fold in a whole batch or another RunningStats), plus the
+    running min and max. If quantiles=True a log-spaced histogram of the values
+    up to top is kept as well, exact below 1 / resolution and within a relative
+    resolution above that.
+    """
+
+    def __init__(self, length, quantiles=False, top=None, resolution=0.05):
+        self.count = 0
+        self.mean = np.zeros(length)
+        self.m2 = np.zeros(length) # sum of squared deviations from the mean
+        self.min = np.full(length, np.inf)
+        self.max = np.full(length, -np.inf)
+        self.hist = None
+        if quantiles:
+            self.linear = int(np.ceil(1 / resolution)) # bins below this are exact
+            self.ratio = np.log1p(resolution)
+            bins = self.linear + int(np.log(max(top, self.linear) / self.linear) / self.ratio) + 2
+            self.hist = np.zeros((length, bins), dtype=np.int64)
+
+    @property
+    def std(self):
+        if self.count == 0:
+            return np.zeros_like(self.mean)
+        return np.sqrt(self.m2 / self.count)
+
+    def band(self, width=1):
+        # (lower, upper) edges of mean -/+ width standard deviations
+        dev = width * self.std
+        return self.mean - dev, self.mean + dev
+
+    def update(self, X):
+        # folds in a (replicates, timepoints) array of finished replicates
+        X = np.asarray(X, dtype=np.float64).reshape(-1, self.mean.size)
+        n = X.shape[0]
+        if n == 0:
+            return
+        mean = np.mean(X, axis=0)
+        m2 = np.sum((X - mean) ** 2, axis=0)
+        self._combine(n, mean, m2)
+        np.minimum(self.min, X.min(axis=0), out=self.min)
+        np.maximum(self.max, X.max(axis=0), out=self.max)
+        if self.hist is not None:
+            bins = self.hist.shape[1]
+            flat = (self._bin(X) + np.arange(self.mean.size) * bins).ravel()
+            self.hist += np.bincount(flat, minlength=self.hist.size).reshape(self.hist.shape)
+
+    def merge(self, other):
+        # folds in the replicates another RunningStats has seen
+        if other.count == 0:
+            return
+        self._combine(other.count, other.mean, other.m2)
+        np.minimum(self.min, other.min, out=self.min)
+        np.maximum(self.max, other.max, out=self.max)
+        if self.hist is not None:
+            self.hist += other.hist
+
+    def extend(self, other):
+        # appends the timepoints of other, which has seen the same replicates
+        if self.count != other.count:
+            raise ValueError("can only extend with statistics of the same replicates")
+        for name in ("mean", "m2", "min", "max", "hist"):
+            if getattr(self, name) is not None:
+                setattr(self, name, np.concatenate([getattr(self, name), getattr(other, name)]))
+
+    def truncate(self, length):
+        # keeps only the first length timepoints
+        for name in ("mean", "m2", "min", "max", "hist"):
+            if getattr(self, name) is not None:
+                setattr(self, name, getattr(self, name)[:length])
+
+    def quantile(self, q):
+        # q-th quantile at every timepoint (needs quantiles=True)
+        if self.hist is None:
+            raise ValueError("RunningStats was made without quantiles=True")
+        cumulative = np.cumsum(self.hist, axis=1)
+        index = np.argmax(cumulative >= q * self.count, axis=1)
+        return np.clip(self._value(index), self.min, self.max)
+
+    def _combine(self, n, mean, m2):
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta ** 2 * self.count * n / total
+        self.count = total
+
+    def _bin(self, X):
+        X = np.maximum(X, 0)
+        with np.errstate(divide="ignore"):
+            log_bin = self.linear + np.floor(np.log(X / self.linear) / self.ratio)
+        index = np.where(X < self.linear, np.floor(X), log_bin)
+        return np.minimum(index, self.hist.shape[1] - 1).astype(np.int64)
+
+    def _value(self, index):
+        # value a bin stands for: itself below linear, else its geometric middle
+        log_value = self.linear * np.exp((index - self.linear + 0.5) * self.ratio)
+        return np.where(index < self.linear, index, log_value)
+
+
+def _batch_stats(size, seed, quantiles=False, **params):
+    # one batch of replicates reduced to per-timepoint statistics
+    trajectories = Markov_engine.simulate(sims=size, seed=seed, **params)
+    stats = []
+    for X in trajectories:
+        stat = RunningStats(X.shape[1], quantiles, params["N"])
+        stat.update(X)
+        stats.append(stat)
+    return stats
+
+
+@result_cache.memoize("Markov_ensemble.ensemble", SOURCES)
+def ensemble(N, I0, k, gamma, steps, sims, schedule=(), start_tick=0, seed=None, mode="tick",
+             epsilon=0.03, batch=25, workers=None, quantiles=False, record=None):
+    """Runs sims replicates of Markov_engine.simulate over a process pool.
+
+    Returns RunningStats for S, I and R over all replicates. Each worker only
+    sends back the statistics of its batch, which are merged here in batch
+    order. quantiles=True also keeps the histograms RunningStats.quantile needs.
+    record is the output grid, as for simulate. Runs with a seed are cached
+    (result_cache), since the result doesn't depend on workers.
+    """
+    func = partial(_batch_stats, N=N, I0=I0, k=k, gamma=gamma, steps=steps, schedule=schedule,
+                   start_tick=start_tick, mode=mode, epsilon=epsilon, quantiles=quantiles,
+                   record=record)
+    results = map_batches(func, sims, seed, batch, workers)
+
+    with instrument.phase("aggregate"):
+        stats = results[0]
+        for result in results[1:]:
+            for stat, other in zip(stats, result):
+                stat.merge(other)
+    return stats
+
+
+def _batch_compare(size, seed, split, scenarios, N, I0, k, gamma, steps, schedule, start_tick,
+                   mode, epsilon, record):
+    # one batch: the shared prefix once, then every scenario from its end state
+    # on the same random stream
+    prefix_seed, suffix_seed = seed.spawn(2)
+    common = dict(N=N, I0=I0, k=k, gamma=gamma, sims=size, mode=mode, epsilon=epsilon)
+    # the prefix also records its last tick, to continue from, even off the grid
+    grid = Markov_engine.record_grid(split, record, last=split == steps)
+    prefix = Markov_engine.simulate(steps=split, schedule=schedule, start_tick=start_tick,
+                                    seed=prefix_seed, record=np.append(grid, split), **common)
+    end = [X[:, -1] for X in prefix]
+    prefix = [X[:, :grid.size] for X in prefix]
+    suffix_grid = Markov_engine.record_grid(steps - split, record, split, first=1, last=True)
+
+    stats = []
+    differences = []
+    for scenario in scenarios:
+        suffix = Markov_engine.simulate(steps=steps - split,
+                                        schedule=list(schedule) + list(scenario),
+                                        start_tick=start_tick + split, seed=suffix_seed,
+                                        initial=end, record=suffix_grid, **common)
+        # (with split == steps the suffix records just its start, already the prefix's end)
+        runs = [np.concatenate([X, Y[:, :suffix_grid.size]], axis=1)
+                for X, Y in zip(prefix, suffix)]
+        stat = []
+        for X in runs:
+            stat.append(RunningStats(X.shape[1]))
+            stat[-1].update(X)
+        stats.append(stat)
+
+        cases = runs[1] + runs[2]
+        if not differences:
+            baseline = cases
+        difference = RunningStats(cases.shape[1])
+        difference.update(cases - baseline)
+        differences.append(difference)
+    return stats, differences
+
+
+@result_cache.memoize("Markov_ensemble.compare", SOURCES)
+def compare(N, I0, k, gamma, steps, sims, split, scenarios, schedule=(), start_tick=0, seed=None,
+            mode="tick", epsilon=0.03, batch=25, workers=None, record=1):
+    """Runs the same replicates under several intervention scenarios.
+
+    Every scenario shares schedule up to tick start_tick + split, so that part
+    is simulated once per replicate; each scenario's extra (tick, factor) pairs
+    then apply from its end state. All scenarios continue on the same random
+    stream (common random numbers), so differences between them are mostly due
+    to the scenario rather than to noise.
+
+    Returns (stats, differences): stats[n] is the (S, I, R) RunningStats of
+    scenario n, differences[n] the RunningStats of its cases (I + R) minus the
+    first scenario's, replicate by replicate. The state is recorded every
+    record ticks, the same grid as tick_times(steps, t0, record).
+    """
+    split = int(min(max(split - start_tick, 0), steps))
+    func = partial(_batch_compare, split=split, scenarios=scenarios, N=N, I0=I0, k=k,
+                   gamma=gamma, steps=steps, schedule=schedule, start_tick=start_tick, mode=mode,
+                   epsilon=epsilon, record=record)
+    results = map_batches(func, sims, seed, batch, workers)
+
+    with instrument.phase("aggregate"):
+        stats, differences = results[0]
+        for other_stats, other_differences in results[1:]:
+            for stat, other in zip(stats, other_stats):
+                for a, b in zip(stat, other):
+                    a.merge(b)
+            for a, b in zip(differences, other_differences):
+                a.merge(b)
+    return stats, differences
@@ -0,0 +1,205 @@
+# File : Markov_metapop.py
+# Date : Oct 18, 2026
+# Description : Markov SIR model over many patches (regions or countries),
+#   each with its own S, I, R, coupled through a sparse mixing matrix. Events
+#   are fired one at a time with Gillespie's direct method, picking the event
+#   from a sum tree over every patch's infection and recovery rates, and an
+#   event only updates the rates of the patches that mix with the one it
+#   happened in. The cost of an event is O(neighbours * log(patches)).
+# Note : like Markov_engine, k and gamma are rates per tick and schedule is
+#   an interventions.Schedule or a list of (tick, factor) pairs applied to
+#   every patch. Every rate is only recomputed when the schedule changes and
+#   once every few times patches events (to clear rounding drift), so a run
+#   costs O(events * log(patches)) plus O(patches) per recorded state
+
+import math
+import numpy as np
+import scipy.sparse as sparse
+import Markov_engine
+
+RECORD = 1440 # ticks between recorded states by default (daily at one-minute ticks)
+
+
+class SumTree:
+    """Partial sums over a fixed number of non-negative weights.
+
+    The weights are the leaves of a complete binary tree whose every node holds
+    the sum of its two children, so changing one weight and finding the weight
+    a cumulative sum falls in both take O(log size).
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.leaves = 1
+        while self.leaves < size:
+            self.leaves *= 2
+        self.tree = [0.0] * (2 * self.leaves)
+
+    @property
+    def total(self):
+        return self.tree[1]
+
+    def set(self, index, value):
+        tree = self.tree
+        node = index + self.leaves
+        tree[node] = value
+        node //= 2
+        while node:
+            tree[node] = tree[2 * node] + tree[2 * node + 1]
+            node //= 2
+
+    def rebuild(self, values):
+        # sets every weight at once, level by level
+        level = np.zeros(self.leaves)
+        level[:self.size] = values
+        tree = [0.0] * self.leaves + level.tolist()
+        while level.size > 1:
+            level = level[0::2] + level[1::2]
+            tree[level.size:2 * level.size] = level.tolist()
+        self.tree = tree
+
+    def find(self, x):
+        # index of the weight whose cumulative range holds x (0 <= x < total)
+        tree = self.tree
+        node = 1
+        while node < self.leaves:
+            node *= 2
+            if x >= tree[node]:
+                x -= tree[node]
+                node += 1
+        return node - self.leaves
+
+
+def coupling(neighbours, travel):
+    """Row-stochastic mixing matrix from a sparse patch adjacency matrix.
+
+    Each patch keeps 1 - travel of its contacts at home and spreads travel over
+    its neighbours in proportion to the weights in neighbours (patches without
+    neighbours keep all of them). Returns a CSR matrix.
+    """
+    neighbours = sparse.csr_matrix(neighbours, dtype=np.float64)
+    neighbours.setdiag(0)
+    neighbours.eliminate_zeros()
+    weight = np.asarray(neighbours.sum(axis=1)).ravel()
+    away = np.where(weight > 0, travel, 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scale = np.where(weight > 0, away / weight, 0)
+    return (sparse.diags(scale) @ neighbours + sparse.diags(1 - away)).tocsr()
+
+
+def simulate(N, I0, k, gamma, mixing, steps, schedule=(), start_tick=0, seed=None, record=RECORD,
+             block=4096):
+    """One run of the metapopulation Markov SIR model.
+
+    N and I0 give every patch's population and initially infected, k and
+    gamma are the per-tick rates (scalars or one per patch) and mixing a
+    sparse (patches, patches) matrix: patch i is infected at rate
+    k * S_i * sum_j mixing[i, j] * I_j / N_j, times the schedule's factor.
+    schedule, start_tick and record work as in Markov_engine.simulate, but
+    record defaults to every RECORD ticks (None records every tick, which
+    costs O(patches) a tick).
+
+    Returns S, I, R as (patches, len(grid)) arrays.
+    """
+    rng = np.random.default_rng(seed)
+    bounds, factors, ends = Markov_engine.segments(schedule, start_tick, steps)
+    grid = Markov_engine.output_grid(steps, record)
+
+    N = np.asarray(N, dtype=np.int64)
+    patches = N.size
+    I0 = np.broadcast_to(np.asarray(I0, dtype=np.int64), (patches,))
+    k_arr = np.broadcast_to(np.asarray(k, dtype=np.float64), (patches,))
+    gamma_arr = np.broadcast_to(np.asarray(gamma, dtype=np.float64), (patches,))
+    mixing = sparse.csr_matrix(mixing, dtype=np.float64)
+    # the patches whose infection rate an event in patch p changes, and by how
+    # much per infected: column p of mixing over N_p
+    columns = sparse.csc_matrix(mixing @ sparse.diags(1 / N))
+    touched, weights = [], []
+    for p in range(patches):
+        touched.append(columns.indices[columns.indptr[p]:columns.indptr[p + 1]].tolist())
+        weights.append(columns.data[columns.indptr[p]:columns.indptr[p + 1]].tolist())
+
+    S = (N - I0).tolist()
+    I = I0.tolist()
+    R = [0] * patches
+    k_list, gamma_list = k_arr.tolist(), gamma_arr.tolist()
+    out = [np.zeros((patches, grid.size), dtype=np.int32) for n in range(3)]
+
+    # leaves 0..patches-1 are infections, patches..2 * patches - 1 recoveries
+    tree = SumTree(2 * patches)
+    seg = 0
+    factors = factors.tolist()
+    force = []
+    cleanup = max(8 * patches, 4096) # events between rebuilds that clear drift
+    events = 0
+
+    def refresh():
+        # recomputes every rate from scratch, also clearing rounding drift
+        nonlocal force, events
+        events = 0
+        force = mixing @ (np.array(I) / N)
+        infection = k_arr * np.array(S) * force * factors[seg]
+        force = force.tolist()
+        tree.rebuild(np.concatenate([infection, gamma_arr * np.array(I)]))
+
+    refresh()
+    ends, record_ticks = ends.tolist(), grid.tolist()
+    pos = 0.0
+    row = 0
+    j = 0 # next grid column to record
+    draws = rng.random(block).tolist()
+    while True:
+        if events == cleanup:
+            refresh()
+        limit = min(ends[seg], record_ticks[j])
+        total = tree.total
+        if row == block:
+            draws = rng.random(block).tolist()
+            row = 0
+        wait = -math.log(1 - draws[row]) / total if total > 0 else math.inf
+        row += 1
+
+        if pos + wait >= limit:
+            # nothing more happens before the limit, and the wait is memoryless
+            pos = limit
+            if pos == record_ticks[j]:
+                for X, state in zip(out, (S, I, R)):
+                    X[:, j] = state
+                j += 1
+                if j == grid.size:
+                    break
+            if pos == ends[seg] and seg + 1 < len(factors):
+                seg += 1
+                refresh() # the factor of every infection rate changed
+            continue
+        pos += wait
+        events += 1
+
+        if row == block:
+            draws = rng.random(block).tolist()
+            row = 0
+        event = tree.find(draws[row] * total)
+        row += 1
+        factor = factors[seg]
+        if event < patches:
+            p = event
+            if S[p] == 0:
+                continue # only rounding could pick an empty patch
+            S[p] -= 1
+            I[p] += 1
+            sign = 1
+        else:
+            p = event - patches
+            if I[p] == 0:
+                continue
+            I[p] -= 1
+            R[p] += 1
+            sign = -1
+        for i, w in zip(touched[p], weights[p]):
+            force[i] += sign * w
+            tree.set(i, max(k_list[i] * S[i] * force[i] * factor, 0.0))
+        tree.set(p, max(k_list[p] * S[p] * force[p] * factor, 0.0))
+        tree.set(patches + p, gamma_list[p] * I[p])
+
+    S, I, R = out
+    return S, I, R
@@ -0,0 +1,135 @@
+# File : Markov_network.py
+# Date : Oct 18, 2026
+# Description : Individual-level SIR on a contact network instead of
+#   homogeneous mixing over all N people. The network is a random graph kept
+#   as CSR arrays (indptr, indices), so there is no Python object per person.
+#   The epidemic is event driven: when someone is infected their recovery time
+#   and the time the infection would cross each of their contacts are drawn
+#   at once, and the crossings that could still matter go on a priority queue.
+#   Quarantine levels cut contacts: every contact has a fixed random rank and
+#   is only in use while the schedule's factor is above it, so a factor of .55
+#   keeps 55% of contacts and tighter levels cut a superset of looser ones.
+# Note : as in Markov_engine, rates are per tick and schedule is an
+#   interventions.Schedule or a list of (tick, factor) pairs
+
+import bisect
+import heapq
+import numpy as np
+import Markov_engine
+
+
+def random_graph(n, mean_degree, seed=None):
+    """Erdos-Renyi style random graph on n people in CSR form.
+
+    Draws round(n * mean_degree / 2) contacts between uniformly random pairs
+    (self contacts are dropped, the rare repeated pair is kept). Returns
+    (indptr, indices, rank): the contacts of person i are
+    indices[indptr[i]:indptr[i + 1]], and rank holds every contact's uniform
+    rank, the same in both directions.
+    """
+    rng = np.random.default_rng(seed)
+    m = int(round(n * mean_degree / 2))
+    dtype = np.int32 if n < 2 ** 31 else np.int64
+    a = rng.integers(0, n, m, dtype=dtype)
+    b = rng.integers(0, n, m, dtype=dtype)
+    keep = a != b
+    a, b = a[keep], b[keep]
+    rank = rng.random(a.size, dtype=np.float32)
+
+    source = np.concatenate([a, b])
+    order = np.argsort(source, kind="stable")
+    indices = np.concatenate([b, a])[order]
+    rank = np.concatenate([rank, rank])[order]
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(source, minlength=n), out=indptr[1:])
+    return indptr, indices, rank
+
+
+def transmission_rate(R0, gamma, indptr):
+    # per-contact rate giving R0 on this graph: a new case passes it on to each
+    # of their other contacts with chance beta / (beta + gamma), and has
+    # <k^2 - k> / <k> of them on average
+    degree = np.diff(indptr).astype(np.float64)
+    excess = np.sum(degree * (degree - 1)) / np.sum(degree)
+    chance = min(R0 / excess, 1 - 1e-12)
+    return gamma * chance / (1 - chance)
+
+
+def simulate(graph, I0, beta, gamma, steps, schedule=(), start_tick=0, seed=None, record=None):
+    """One run of the SIR model on graph = (indptr, indices, rank).
+
+    I0 random people are infected at tick 0. Infection crosses each contact in
+    use at rate beta per tick and people recover at rate gamma per tick.
+    schedule, start_tick and record work as in Markov_engine.simulate.
+
+    Returns S, I, R counts on the grid and the tick each person was infected
+    at (nan if never).
+    """
+    indptr, indices, rank = graph
+    n = indptr.size - 1
+    rng = np.random.default_rng(seed)
+    bounds, factors, ends = Markov_engine.segments(schedule, start_tick, steps)
+    starts = [0.0] + bounds.tolist()
+    factors = factors.tolist()
+    grid = Markov_engine.output_grid(steps, record)
+
+    infected = np.full(n, np.nan) # tick each person was infected at
+    recovered = np.full(n, np.inf) # tick they recover at
+    soonest = np.full(n, np.inf) # earliest infection queued for each person
+    queue = [(0.0, int(person)) for person in rng.choice(n, size=min(I0, n), replace=False)]
+    heapq.heapify(queue)
+
+    while queue:
+        t, person = heapq.heappop(queue)
+        if t >= steps:
+            break
+        if not np.isnan(infected[person]):
+            continue
+        infected[person] = t
+        end = t + rng.exponential(1 / gamma)
+        recovered[person] = end
+
+        contacts = indices[indptr[person]:indptr[person + 1]]
+        if contacts.size == 0:
+            continue
+        crossing = _crossings(t, rng.exponential(1 / beta, contacts.size),
+                              rank[indptr[person]:indptr[person + 1]], starts, factors)
+        ok = (crossing < end) & (crossing < soonest[contacts]) & np.isnan(infected[contacts])
+        ok &= crossing < steps
+        for when, who in zip(crossing[ok].tolist(), contacts[ok].tolist()):
+            soonest[who] = when
+            heapq.heappush(queue, (when, who))
+
+    # someone infected at t shows up in the state after every tick past t,
+    # and the I0 infected at tick 0 in the initial state (column 0) as well
+    times = infected[~np.isnan(infected)]
+    infections = np.bincount(np.where(times > 0, np.searchsorted(grid, times, "right"), 0),
+                             minlength=grid.size + 1)
+    recoveries = np.bincount(np.searchsorted(grid, recovered[recovered < steps], "right"),
+                             minlength=grid.size + 1)
+    cases = np.cumsum(infections)[:grid.size]
+    R = np.cumsum(recoveries)[:grid.size]
+    return n - cases, cases - R, R, infected
+
+
+def _crossings(t, clock, rank, starts, factors):
+    # tick at which each contact passes the infection on, given clock ticks of
+    # exposure while the contact is in use (factor above its rank); the
+    # contact's clock only runs in the schedule segments where it is in use
+    first = bisect.bisect_right(starts, t) - 1
+    if first == len(factors) - 1: # no more changes to come
+        return np.where(rank < factors[first], t + clock, np.inf)
+    crossing = np.full(clock.size, np.inf)
+    left = clock.astype(np.float64)
+    pending = np.ones(clock.size, dtype=bool)
+    for seg in range(first, len(factors)):
+        a = max(starts[seg], t)
+        b = starts[seg + 1] if seg + 1 < len(starts) else np.inf
+        active = pending & (rank < factors[seg])
+        done = active & (left < b - a)
+        crossing[done] = a + left[done]
+        pending &= ~done
+        left[active & ~done] -= b - a
+        if not pending.any():
+            break
+    return crossing
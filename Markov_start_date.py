@@ -4,9 +4,10 @@
 # Description : Explores the true start date of COVID-19 in New Zealand using
 #   data from Markov_SIR.py
 
-import matplotlib.pyplot as plt
-import random
 import numpy as np
+import instrument
+import Markov_engine
+import Markov_ensemble
 
 final_I = 46 # people infected on March 1 (data from Markov_SIR.py)
 
@@ -19,44 +20,47 @@ N = 4886000 # total population (New Zealand's population)
 I0 = 1 # amount of initially infected people
 steps = 100000 # amount of steps to take in each simulation
 sims = 1000 # amount of simulations to average over
+workers = None # processes to run simulations on (None uses every core)
 #----------------------------------------------------
 
-gamma = 1 / serial_interval / t0 # rate of recovery
-k = R0 * gamma # rate of infection
-
-end_times = []
-end_times_hist = []
-
-for a in range(0, sims):
-    S = N - I0 # susceptible
-    I = I0 # infected
-    R = 0 # recovered
-    
-    for t in range(0, steps):
-        delta_I = k * S * I / N # chance of infection
-        delta_R = gamma * I # chance of recovery
-    
-        step = random.random() # picks random float between 0 and 1
-    
-        if step > 0 and step <= delta_I: # someone is infected
-            I += 1
-            S -= 1
-        elif step > delta_I and step <= delta_R + delta_I: # someone recovers
-            R += 1
-            I -= 1
-        else: # nothing happens
-            pass
-    
-        if I + R == final_I:
-            end_times.append(t / t0)
-            end_times_hist.append(int(t / t0))
-            break
-
-plt.hist(end_times_hist)
-plt.xlabel("time (days)")
-plt.ylabel("occurrences")
-plt.title("Simulated Date of First COVID-19 Case \n (given in days before Feb. 28, first confirmed case)")
-plt.show()
-
-print("mean : ", np.mean(end_times))
-print("standard deviation : ", np.std(end_times))
\ No newline at end of file
+k, gamma = Markov_engine.rates(R0, serial_interval, t0) # rates of infection/recovery
+
+def passage_times(size, seed):
+    # days until I + R first reaches final_I, and which replicates died out
+    ticks, extinct = Markov_engine.first_passage(N, I0, k, gamma, final_I, steps, size, seed=seed)
+    return ticks / t0, extinct
+
+
+def run(sims=sims, seed=None, workers=workers):
+    # first passage days of every replicate (nan if it never got to final_I)
+    # and which replicates died out
+    results = Markov_ensemble.map_batches(passage_times, sims, seed=seed, batch=250,
+                                          workers=workers)
+    times = np.concatenate([r[0] for r in results])
+    extinct = np.concatenate([r[1] for r in results])
+    return times, extinct
+
+
+def summary(times, extinct):
+    end_times = times[~np.isnan(times)] # replicates that reached final_I
+    print("mean : ", np.mean(end_times))
+    print("standard deviation : ", np.std(end_times))
+    print("extinction probability : ", np.mean(extinct))
+
+
+@instrument.timed("plot")
+def plot(times):
+    import matplotlib.pyplot as plt
+    end_times_hist = [int(t) for t in times[~np.isnan(times)]]
+
+    plt.hist(end_times_hist)
+    plt.xlabel("time (days)")
+    plt.ylabel("occurrences")
+    plt.title("Simulated Date of First COVID-19 Case \n (given in days before Feb. 28, first confirmed case)")
+    plt.show()
+
+
+if __name__ == "__main__":
+    times, extinct = run()
+    plot(times)
+    summary(times, extinct)
@@ -6,100 +6,56 @@
 # Note : I am studying only the linear part portion of the logarithmic data from
 #   New Zealand.
 
+import datetime
 import numpy as np
-import matplotlib.pyplot as plt
-
-
-file = open("total-cases-covid-19.csv", "r") # file containing NZ case data
-entries = file.readlines()
-file.close()
-data = []
-for i in entries:
-    if i[0:11] == "New Zealand":
-        data.append(i)
-
-n = 0        
-while data[n][17:20] != "Mar":
-    n += 1
-n += 6
-
-dates = []
-log_cases = []
-for m in range(n, n + 13):
-    line = data[m]
-    line = line.split(",")
-    dates.append(int(line[2][5:]))
-    log_cases.append(np.log(int(line[-1])))
-    
-sum_x = 0
-sum_x_squared = 0
-sum_y = 0
-sum_xy = 0
-length = len(dates)
-for n in range(0, length):
-    sum_x += dates[n]
-    sum_x_squared += dates[n]**2
-    sum_y += log_cases[n]
-    sum_xy += log_cases[n] * dates[n]
-
-delta = length * sum_x_squared - sum_x**2
-
-A = (sum_x_squared * sum_y - sum_x * sum_xy) / delta
-B = (length * sum_xy - sum_x * sum_y) / delta
-   
-x = np.linspace(1, 29, 1000)
-y = A + B*x
-
-sigma_y = 0
-for n in range(0, length):
-    sigma_y += (log_cases[n] - A - B * dates[n])**2
-
-sigma_y /= (length - 2)
-sigma_y = np.sqrt(sigma_y)
-
-sigma_A = sigma_y * np.sqrt(sum_x_squared / delta)
-sigma_B = sigma_y * np.sqrt(length / delta)
-
-print("A = ", A)
-print("B = ", B)
-print("sigma_A = ", sigma_A)
-print("sigma_B = ", sigma_B)
-
-plt.plot(dates, log_cases, "o")
-plt.plot(x, y, 'r')
-plt.xlabel("days")
-plt.ylabel("log(cases)")
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+import instrument
+import case_data
+import growth_fit
 
 
+def march_fit():
+    # log-linear fit of NZ's cases over 13 days starting March 7; returns the
+    # day of March, log cases and A, B, sigma_A, sigma_B
+    # NZ case data from March on
+    days, cases = case_data.load().series("New Zealand", datetime.date(2020, 3, 1))
+    days, cases = days[6:19], cases[6:19] # 13 entries starting with the 7th in March
 
+    dates = days - case_data.day(datetime.date(2020, 2, 29)) # day of March
+    log_cases = np.log(cases)
 
+    A, B, sigma_A, sigma_B, r2 = growth_fit.fit(dates, log_cases)
+    return dates, log_cases, A, B, sigma_A, sigma_B
 
 
+def best_window(country="New Zealand", serial_interval=4):
+    # most linear window of the country, picked by R^2 instead of by hand
+    table = growth_fit.growth_table(serial_interval=serial_interval)
+    return table[table["country"] == country][0]
 
 
+def summary(A, B, sigma_A, sigma_B, best):
+    print("A = ", A)
+    print("B = ", B)
+    print("sigma_A = ", sigma_A)
+    print("sigma_B = ", sigma_B)
+    print("best NZ window : ", best["length"], "days from day", best["start_day"], "since Dec 31")
+    print("B = ", best["B"], "+/-", best["sigma_B"], ", R0 = ", best["R0"], ", R^2 = ", best["r2"])
 
 
+@instrument.timed("plot")
+def plot(dates, log_cases, A, B):
+    import matplotlib.pyplot as plt
+    x = np.linspace(1, 29, 1000)
+    y = A + B*x
 
+    plt.plot(dates, log_cases, "o")
+    plt.plot(x, y, 'r')
+    plt.xlabel("days")
+    plt.ylabel("log(cases)")
+    plt.show()
 
 
+if __name__ == "__main__":
+    dates, log_cases, A, B, sigma_A, sigma_B = march_fit()
+    summary(A, B, sigma_A, sigma_B, best_window())
+    plot(dates, log_cases, A, B)
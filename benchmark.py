@@ -0,0 +1,253 @@
+# File : benchmark.py
+# Date : Oct 18, 2026
+# Description : Benchmarks every simulation and fitting entry point with
+#   fixed seeds and the same parameters the scripts run with. Each benchmark
+#   runs in its own fresh process and reports its best wall time over a few
+#   repeats, its rate (events, steps or fits per second, see UNITS) and the
+#   process's peak memory. Results are compared against the stored baseline in
+#   benchmark_baseline.json and anything slower than the tolerance is flagged.
+# Note : python benchmark.py [names] [--repeat 3] [--save] [--tolerance .3]
+#   --save replaces the baseline with this run, so only save on the machine the
+#   baseline is meant for
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+import numpy as np
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+
+# the quick entry points are run several times over, so that every benchmark
+# takes long enough to time reliably
+
+def sir_getsets():
+    # SIR_Modeling.py's __main__ example, forward Euler (x 50)
+    import SIR_Modeling
+    sir = SIR_Modeling.SIR([4886000, 15, 0, 0, 0], [0.308, 0.25, 0, 48, 50, 52, 54])
+    for n in range(50):
+        sir.getSets(9500, 0.01)
+    return 50 * 9500
+
+
+def sir_solve():
+    # the same example through the adaptive solver (x 50)
+    import SIR_Modeling
+    sir = SIR_Modeling.SIR([4886000, 15, 0, 0, 0], [0.308, 0.25, 0, 48, 50, 52, 54])
+    evaluations = 0
+    for n in range(50):
+        sir.solve(95)
+        evaluations += sir.nfev
+    return evaluations
+
+
+def sir_sweep():
+    # 100 parameter sets around the example for 95 days
+    import SIR_Modeling
+    beta = np.linspace(0.25, 0.35, 10)[:, None]
+    q1 = np.arange(41, 51)[None, :]
+    SIR_Modeling.sweep([4886000, 15, 0, 0, 0], beta, 0.25, 0, q1, q1 + 2, q1 + 4, q1 + 6, 9500,
+                       0.01, 100)
+    return 9500 * beta.size * q1.size
+
+
+def calibration_fit():
+    # one least squares run from the hand-tuned values
+    import calibration
+    days, cases = calibration.load_cases()
+    fit = calibration.Calibration(days, cases)
+    fit.fit(np.array([fit.values[p] for p in fit.free]))
+    return fit.evaluations
+
+
+def markov_ensemble():
+    # Markov_SIR.py's ensemble (every replicate in this process)
+    import Markov_SIR as m
+    import Markov_ensemble
+    S, I, R = Markov_ensemble.ensemble(m.N, m.I0, m.k, m.gamma, m.steps, m.sims, m.schedule,
+                                       start_tick=m.t0, seed=1, mode=m.mode, epsilon=m.epsilon,
+                                       workers=1, record=m.record)
+    return int(round((m.N - S.mean[-1] + R.mean[-1]) * m.sims))
+
+
+def markov_hybrid():
+    # an unmitigated epidemic through New Zealand's whole population, on the
+    # chain while few are infected and the ODE after
+    import Markov_engine
+    import Markov_SIR as m
+    k, gamma = Markov_engine.rates(2.0, m.serial_interval, m.t0)
+    S, I, R = Markov_engine.simulate(m.N, m.I0, k, gamma, 200 * m.t0, 50, seed=1, mode="hybrid",
+                                     record=m.t0)
+    return int(np.sum(m.N - S[:, -1]) + np.sum(R[:, -1]))
+
+
+def markov_q_comp():
+    # Markov_Q_comp.py's quarantine levels on common random numbers
+    import Markov_Q_comp as m
+    import Markov_ensemble
+    levels = [[(m.Q_start * m.t0, 1 - b * .15)] for b in range(0, 5)]
+    stats, differences = Markov_ensemble.compare(m.N, m.I0, m.k, m.gamma, m.steps, m.sims,
+                                                 m.Q_start * m.t0, levels, start_tick=m.t0, seed=1,
+                                                 mode=m.mode, epsilon=m.epsilon, workers=1,
+                                                 record=m.record)
+    return int(round(sum((m.N - S.mean[-1] + R.mean[-1]) * m.sims for S, I, R in stats)))
+
+
+def markov_start_date():
+    # Markov_start_date.py's first passage times (x 20)
+    import Markov_start_date as m
+    import Markov_ensemble
+    for seed in range(20):
+        Markov_ensemble.map_batches(m.passage_times, m.sims, seed=seed, batch=250, workers=1)
+    return 20 * m.sims
+
+
+def r0_regression():
+    # R0_extraction.py's fit of New Zealand's March window, then every window
+    # of every country (x 10)
+    import datetime
+    import case_data
+    import growth_fit
+    fits = 0
+    for n in range(10):
+        days, cases = case_data.load().series("New Zealand", datetime.date(2020, 3, 1))
+        growth_fit.fit(days[6:19], np.log(cases[6:19]))
+        store = case_data.open_store()
+        windows = growth_fit.fit_windows(store.day, store.cases, store.starts, range(7, 22), 10)
+        growth_fit.best_windows(windows)
+        fits += windows["B"].size + 1
+    return fits
+
+
+def compartments_seir():
+    # the stochastic SEIR from the shared model spec, Markov_SIR.py's setup
+    import compartments
+    import Markov_SIR as m
+    model = compartments.seir()
+    X = model.simulate([m.N - m.I0, 0, m.I0, 0], dict(beta=m.R0 / m.serial_interval, sigma=1 / 3,
+                                                    gamma=1 / m.serial_interval),
+                       m.steps, 25, m.t0, m.schedule, start_tick=m.t0, seed=1, record=m.record)
+    return int(np.sum(m.N - X[0][:, -1]) + np.sum(X[1][:, -1] + X[2][:, -1]) + np.sum(X[3][:, -1]))
+
+
+def metapop():
+    # 1000 patches of 5000 on a ring with random shortcuts
+    import scipy.sparse as sparse
+    import Markov_engine
+    import Markov_metapop
+    rng = np.random.default_rng(1)
+    patches = 1000
+    i = np.arange(patches)
+    links = sparse.coo_matrix((np.ones(2 * patches), (np.r_[i, i], np.r_[(i + 1) % patches,
+                              rng.integers(0, patches, patches)])), shape=(patches, patches))
+    mixing = Markov_metapop.coupling(links + links.T, 0.05)
+    k, gamma = Markov_engine.rates(2.0, 4, 1440)
+    I0 = np.zeros(patches, dtype=np.int64)
+    I0[0] = 20
+    S, I, R = Markov_metapop.simulate(np.full(patches, 5000), I0, k, gamma, mixing, 60 * 1440,
+                                      seed=1, record=1440)
+    return int(np.sum(5000 - S[:, -1]) + np.sum(R[:, -1]))
+
+
+def network():
+    # a 200,000 person contact network through a whole epidemic
+    import Markov_network
+    gamma = 1 / 4 / 1440
+    graph = Markov_network.random_graph(200000, 10, seed=1)
+    beta = Markov_network.transmission_rate(2.0, gamma, graph[0])
+    S, I, R, infected = Markov_network.simulate(graph, 20, beta, gamma, 200 * 1440, seed=1,
+                                                record=1440)
+    return int(200000 - S[-1])
+
+
+BENCHMARKS = {f.__name__: f for f in (sir_getsets, sir_solve, sir_sweep, calibration_fit,
+                                      markov_ensemble, markov_hybrid, markov_q_comp,
+                                      markov_start_date, r0_regression, compartments_seir, metapop,
+                                      network)}
+
+UNITS = {"sir_getsets": "steps", "sir_solve": "rhs evals", "sir_sweep": "set-steps",
+         "calibration_fit": "model evals", "markov_ensemble": "events", "markov_hybrid": "events",
+         "markov_q_comp": "events", "markov_start_date": "replicates", "r0_regression": "fits",
+         "compartments_seir": "events", "metapop": "events", "network": "infections"}
+
+
+def _measure(name, repeat):
+    # runs in a fresh process: best of repeat runs, and this process's peak RSS
+    import instrument
+    import result_cache
+    result_cache.configure(enabled=False) # time the work, not the cache
+    best = np.inf
+    for n in range(repeat):
+        start = time.perf_counter()
+        count = BENCHMARKS[name]()
+        best = min(best, time.perf_counter() - start)
+    return {"seconds": best, "count": count, "rate": count / best, "peak_mb": instrument._peak()}
+
+
+def run(names=None, repeat=3):
+    """Runs the named benchmarks (all of them by default) one process each.
+
+    Returns {name: {"seconds", "count", "rate", "peak_mb"}}.
+    """
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for name in names or BENCHMARKS:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            results[name] = pool.submit(_measure, name, repeat).result()
+    return results
+
+
+def compare(results, baseline, tolerance=0.3):
+    # names of the benchmarks more than tolerance slower than the baseline
+    slower = []
+    for name, result in results.items():
+        if name in baseline and result["seconds"] > baseline[name]["seconds"] * (1 + tolerance):
+            slower.append(name)
+    return slower
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the simulation and fitting code.")
+    parser.add_argument("names", nargs="*", help="benchmarks to run (default: all of "
+                        + ", ".join(BENCHMARKS) + ")")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark, best is kept")
+    parser.add_argument("--baseline", default=BASELINE, help="stored baseline to compare to")
+    parser.add_argument("--tolerance", type=float, default=0.3,
+                        help="fraction slower than the baseline that counts as a regression")
+    parser.add_argument("--save", action="store_true", help="store this run as the baseline")
+    args = parser.parse_args()
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error("unknown benchmark(s): " + ", ".join(sorted(unknown)))
+    os.chdir(os.path.dirname(os.path.abspath(__file__))) # the scripts read data from here
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+
+    results = run(args.names, args.repeat)
+    slower = compare(results, baseline, args.tolerance)
+    print("%-18s %10s %10s %14s %10s" % ("benchmark", "seconds", "baseline", "rate", "peak MB"))
+    for name, result in results.items():
+        base = "%.3f" % baseline[name]["seconds"] if name in baseline else "-"
+        rate = "%.3g %s/s" % (result["rate"], UNITS[name])
+        peak = "-" if result["peak_mb"] is None else "%.1f" % result["peak_mb"]
+        flag = "  SLOWER" if name in slower else ""
+        print("%-18s %10.3f %10s %14s %10s%s" % (name, result["seconds"], base, rate, peak, flag))
+
+    if args.save:
+        saved = {"machine": {"python": platform.python_version(), "numpy": np.__version__,
+                             "platform": platform.platform(), "cpus": os.cpu_count()},
+                 "results": dict(baseline, **results)}
+        with open(args.baseline, "w") as file:
+            json.dump(saved, file, indent=2, sort_keys=True)
+            file.write("\n")
+    if slower:
+        print("slower than the baseline:", ", ".join(slower))
+        sys.exit(1)
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Phys 128L: Epidemiology Lab
+Calibration of the SIR model
+
+Fits beta, gamma, the four quarantine multipliers (0.8/0.7/0.6/0.5 by hand
+in SIR.advance) and the initial number infected to the cumulative case counts
+in NewZealand.csv by least squares on log(1 + cases).
+
+Every model evaluation goes through SIR_Modeling.sweep, and the finite
+difference Jacobian is one sweep of all the perturbed parameter sets at once.
+Repeated evaluations at the same point are cached, several starting points
+are run in parallel, and the fitted parameters come with confidence intervals,
+either from the Jacobian at the optimum (clipped to BOUNDS, with parameters
+that end up on a bound flagged since the interval means little there) or by
+refitting to bootstrap resamples of the residuals.
+"""
+
+import copy
+import csv
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import scipy.optimize as opt
+import scipy.stats as sp
+import instrument
+import result_cache
+import SIR_Modeling
+
+PARAMS = ("beta", "gamma", "m1", "m2", "m3", "m4", "I0")
+GUESS = {"beta": 0.308, "gamma": 0.25, "m1": 0.8, "m2": 0.7, "m3": 0.6, "m4": 0.5, "I0": 15}
+BOUNDS = {"beta": (0.01, 2.0), "gamma": (0.01, 1.0), "m1": (0.0, 1.5), "m2": (0.0, 1.5),
+          "m3": (0.0, 1.5), "m4": (0.0, 1.5), "I0": (0.01, 100)}
+BOUND_TOL = 1e-3 #fraction of a parameter's range from a bound that counts as on it
+
+
+@instrument.timed('load')
+def load_cases(path='NewZealand.csv', start=49):
+    #days since `start` (the day SIR.graph lines the model up with) and the
+    #cumulative cases, from the first confirmed case on
+    days = []
+    cases = []
+    with open(path, 'r') as file:
+        for line in csv.reader(file):
+            if float(line[3]) >= start and float(line[2]) > 0:
+                days.append(float(line[3]) - start)
+                cases.append(float(line[2]))
+    return np.array(days), np.array(cases)
+
+
+class Calibration:
+    def __init__(self, days, cases, N=4886000, qdays=(41, 43, 45, 47),
+                 free=PARAMS, fixed=None, dt=0.25):
+        #days must be whole days and qdays are the quarantine days of RealParam in
+        #SIR_Modeling.py; free names the parameters that are fitted,
+        #the rest are held at fixed (or GUESS)
+        self.days = np.asarray(days, dtype = int)
+        self.cases = np.asarray(cases, dtype = float)
+        self.N = N
+        self.qdays = qdays
+        self.free = tuple(free)
+        self.values = dict(GUESS, **(fixed or {}))
+        self.dt = dt
+        self.every = int(round(1 / dt))
+        self.nsteps = int(self.days.max()) * self.every
+        self.lower = np.array([BOUNDS[p][0] for p in self.free])
+        self.upper = np.array([BOUNDS[p][1] for p in self.free])
+        self.cache = {}
+        self.evaluations = 0
+
+    def model(self, X):
+        #cumulative cases on each of self.days for every row of free parameters in X
+        X = np.atleast_2d(X)
+        full = {p: np.full(len(X), self.values[p]) for p in PARAMS}
+        for j, p in enumerate(self.free):
+            full[p] = X[:, j]
+        q1, q2, q3, q4 = self.qdays
+        mults = np.stack([full['m1'], full['m2'], full['m3'], full['m4']], axis = 1)
+        ICs = [self.N - full['I0'], full['I0'], 0, 0, 0]
+        out = SIR_Modeling.sweep(ICs, full['beta'], full['gamma'], 0, q1, q2, q3, q4,
+                                 self.nsteps, self.dt, self.every, mults)
+        self.evaluations += len(X)
+        return self.N - out[:, 0, self.days]
+
+    def residuals(self, x):
+        key = tuple(x)
+        if key not in self.cache:
+            self.cache[key] = np.log1p(self.model(x)[0]) - np.log1p(self.cases)
+        return self.cache[key]
+
+    def jacobian(self, x):
+        #forward differences, with x and every perturbed point in a single sweep
+        steps = 1e-6 * np.maximum(np.abs(x), 1e-3)
+        steps = np.where(x + steps > self.upper, -steps, steps)
+        X = np.vstack([x, x + np.diag(steps)])
+        r = np.log1p(self.model(X)) - np.log1p(self.cases)
+        self.cache.setdefault(tuple(x), r[0])
+        return ((r[1:] - r[0]) / steps[:, None]).T
+
+    def fit(self, x0):
+        #one least squares run from x0; returns a dict with the fit and its errors
+        #the Wald intervals are clipped to the bounds and 'at_bound' flags the
+        #parameters within BOUND_TOL of the range from a bound, whose intervals
+        #shouldn't be trusted (use calibrate(..., bootstrap=n) for those)
+        result = opt.least_squares(self.residuals, x0, jac = self.jacobian,
+                                   bounds = (self.lower, self.upper), x_scale = 'jac')
+        m, n = len(self.cases), len(x0)
+        J = self.jacobian(result.x)
+        dof = max(m - n, 1)
+        s2 = np.sum(result.fun ** 2) / dof
+        cov = np.linalg.pinv(J.T @ J) * s2
+        error = np.sqrt(np.maximum(np.diag(cov), 0))
+        half = sp.t.ppf(0.975, dof) * error
+        ci = np.clip(np.stack([result.x - half, result.x + half], axis = 1),
+                     self.lower[:, None], self.upper[:, None])
+        tol = BOUND_TOL * (self.upper - self.lower)
+        at_bound = (result.x - self.lower <= tol) | (self.upper - result.x <= tol)
+        return {'x': result.x, 'cost': result.cost, 'error': error, 'ci': ci,
+                'at_bound': at_bound, 'success': result.success,
+                'evaluations': self.evaluations}
+
+    def resampled(self, x, rng):
+        #a copy fitted to synthetic cases: the model at x plus the residuals at x
+        #drawn with replacement (residual bootstrap on log(1 + cases))
+        r = self.residuals(x)
+        other = copy.copy(self)
+        other.cases = np.expm1(np.log1p(self.cases) + r - rng.choice(r, r.size))
+        other.cache = {}
+        other.evaluations = 0
+        return other
+
+
+def _fit_from(calibration, x0):
+    return calibration.fit(x0)
+
+
+def _refit(calibration, x, seed):
+    #the fit to one bootstrap resample, started from the original fit x
+    return calibration.resampled(x, np.random.default_rng(seed)).fit(x)['x']
+
+
+def bootstrap(calibration, x, samples, seed=None, workers=None):
+    #percentile 95% intervals from refitting samples bootstrap resamples of
+    #the residuals at the fit x; returns (intervals, every refit)
+    seeds = np.random.SeedSequence(seed).spawn(samples)
+    if workers == 1:
+        fits = [_refit(calibration, x, s) for s in seeds]
+    else:
+        with ProcessPoolExecutor(max_workers = workers) as pool:
+            fits = list(pool.map(_refit, [calibration] * samples, [x] * samples, seeds))
+    fits = np.array(fits)
+    return np.percentile(fits, [2.5, 97.5], axis = 0).T, fits
+
+
+@result_cache.memoize('calibration.calibrate', ('calibration', 'SIR_Modeling', 'compartments'))
+def calibrate(days, cases, starts=4, workers=None, seed=None, bootstrap_samples=0, **options):
+    #multi-start calibration: the hand-tuned values plus starts-1 random points
+    #inside the bounds, run in parallel. Returns the best fit (as for
+    #Calibration.fit, with the parameter names under 'params') and every run
+    #under 'runs'. With bootstrap_samples its 'ci' are bootstrap percentile
+    #intervals instead (the refits are under 'bootstrap'), which stay inside
+    #the bounds and are meaningful for parameters on a bound too.
+    #Fits with a seed are cached as a whole (the sweeps inside are not, they
+    #are single use)
+    calibration = Calibration(days, cases, **options)
+    rng = np.random.default_rng(seed)
+    guess = np.array([calibration.values[p] for p in calibration.free])
+    points = [guess] + [rng.uniform(calibration.lower, calibration.upper)
+                        for i in range(starts - 1)]
+
+    with instrument.phase('fit'):
+        if workers == 1:
+            runs = [calibration.fit(x0) for x0 in points]
+        else:
+            with ProcessPoolExecutor(max_workers = workers) as pool:
+                runs = list(pool.map(_fit_from, [calibration] * len(points), points))
+    if instrument.enabled():
+        instrument.count(fits = len(runs), model_evaluations = sum(r['evaluations'] for r in runs))
+
+    best = dict(min(runs, key = lambda r: r['cost']))
+    best['params'] = calibration.free
+    best['runs'] = runs
+    if bootstrap_samples:
+        with instrument.phase('fit'):
+            best['ci'], best['bootstrap'] = bootstrap(calibration, best['x'], bootstrap_samples,
+                                                      seed, workers)
+    return best
+
+
+def report(fit):
+    #prints every fitted parameter with its interval, marking those on a bound
+    for name, value, (low, high), pinned in zip(fit['params'], fit['x'], fit['ci'],
+                                                fit['at_bound']):
+        print(name, '=', value, ' 95% CI: [', low, ',', high, ']',
+              '(on a bound)' if pinned else '')
+    print('cost =', fit['cost'])
+
+
+if __name__ == "__main__":
+    days, cases = load_cases()
+    report(calibrate(days, cases))
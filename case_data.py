@@ -0,0 +1,246 @@
+# File : case_data.py
+# Date : Oct 18, 2026
+# Description : Shared access to the OWID case data in total-cases-covid-19.csv.
+#   The file is parsed once with real CSV/date parsing into per-country row
+#   ranges and a day-offset array, and cached next to it as a .npz that is
+#   rebuilt only when the CSV changes (size/mtime, then content hash).
+#   build_store/open_store also write the data as fixed-width column files
+#   that are memory-mapped, for going over every country without loading it.
+# Note : days are counted from Dec 31, 2019, the first date in the file
+
+import csv
+import datetime
+import hashlib
+import os
+import numpy as np
+import instrument
+
+EPOCH = datetime.date(2019, 12, 31)
+DATA_FILE = "total-cases-covid-19.csv"
+
+_loaded = {} # CaseData already loaded in this process, by path
+
+
+def day(date):
+    # days since EPOCH of a datetime.date (ints are passed through)
+    if isinstance(date, datetime.date):
+        return (date - EPOCH).days
+    return int(date)
+
+
+class CaseData:
+    """Cumulative case counts for every entity in the OWID file.
+
+    days and cases hold every row, grouped by country. A country's rows are
+    rows[start:stop] with (start, stop) = ranges[name], and its window lookup
+    table maps each day since its first date to the first row on or after it,
+    so any date window is found without searching.
+    """
+
+    def __init__(self, names, codes, starts, days, cases, lookup, lookup_starts):
+        self.names = list(names)
+        self.codes = list(codes)
+        self.starts = starts
+        self.days = days
+        self.cases = cases
+        self.lookup = lookup
+        self.lookup_starts = lookup_starts
+        self.ranges = {name: (int(starts[i]), int(starts[i + 1]))
+                       for i, name in enumerate(self.names)}
+        self._ids = {name: i for i, name in enumerate(self.names)}
+
+    def rows(self, country, start=None, end=None):
+        # slice of rows for country between start and end (dates or days, inclusive)
+        i = self._ids[country]
+        lo, hi = self.ranges[country]
+        if lo == hi:
+            return slice(lo, hi)
+        first = int(self.days[lo])
+        table = self.lookup[self.lookup_starts[i]:self.lookup_starts[i + 1]]
+        a = lo if start is None else lo + self._position(table, day(start) - first, hi - lo)
+        b = hi if end is None else lo + self._position(table, day(end) + 1 - first, hi - lo)
+        return slice(a, max(a, b))
+
+    def series(self, country, start=None, end=None):
+        """Returns (days, cases) arrays for country, views into the full data.
+
+        start and end are datetime.date objects or days since EPOCH, inclusive.
+        """
+        rows = self.rows(country, start, end)
+        return self.days[rows], self.cases[rows]
+
+    @staticmethod
+    def _position(table, offset, length):
+        if offset <= 0:
+            return 0
+        if offset >= table.size:
+            return length
+        return int(table[offset])
+
+
+def _parse(path):
+    # reads the CSV into the arrays CaseData is built from
+    names, codes, starts, days, cases = [], [], [], [], []
+    with open(path, "r", newline="") as file:
+        reader = csv.reader(file)
+        next(reader) # header
+        for entity, code, date, total in reader:
+            if not names or names[-1] != entity:
+                names.append(entity)
+                codes.append(code)
+                starts.append(len(days))
+            parsed = datetime.datetime.strptime(date, "%b %d, %Y").date()
+            days.append((parsed - EPOCH).days)
+            cases.append(int(total) if total else 0)
+    starts.append(len(days))
+
+    starts = np.array(starts, dtype=np.int64)
+    days = np.array(days, dtype=np.int32)
+    cases = np.array(cases, dtype=np.int64)
+
+    # per country: row position of the first row on or after each day
+    tables = [np.zeros(0, dtype=np.int32)]
+    for i in range(len(names)):
+        lo, hi = starts[i], starts[i + 1]
+        order = np.argsort(days[lo:hi], kind="stable")
+        days[lo:hi] = days[lo:hi][order]
+        cases[lo:hi] = cases[lo:hi][order]
+        if hi > lo:
+            span = np.arange(days[hi - 1] - days[lo] + 1) + days[lo]
+            tables.append(np.searchsorted(days[lo:hi], span).astype(np.int32))
+        else:
+            tables.append(np.zeros(0, dtype=np.int32))
+    lookup_starts = np.cumsum([t.size for t in tables])
+    lookup = np.concatenate(tables)
+    return names, codes, starts, days, cases, lookup, lookup_starts
+
+
+def _hash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@instrument.timed("load")
+def load(path=DATA_FILE, cache=True):
+    """Returns the CaseData for path, parsing the CSV only when needed.
+
+    The parsed arrays are kept in path + ".npz" together with the CSV's size,
+    mtime and SHA-1, and reused as long as the size and mtime match (or the
+    hash does, if only the mtime changed). cache=False always re-parses.
+    """
+    key = os.path.abspath(path)
+    stat = os.stat(path)
+    stamp = (stat.st_size, stat.st_mtime_ns)
+    if cache and key in _loaded and _loaded[key][0] == stamp:
+        return _loaded[key][1]
+
+    cache_file = path + ".npz"
+    arrays = None
+    fresh = False # cache file already matches the CSV's size and mtime
+    if cache and os.path.exists(cache_file):
+        try:
+            with np.load(cache_file) as saved:
+                stored = (int(saved["size"]), int(saved["mtime"]))
+                fresh = stored == stamp
+                if fresh or (stored[0] == stamp[0] and str(saved["sha1"]) == _hash(path)):
+                    arrays = (saved["names"], saved["codes"], saved["starts"], saved["days"],
+                              saved["cases"], saved["lookup"], saved["lookup_starts"])
+        except (OSError, KeyError, ValueError):
+            arrays = None # unreadable or out of date cache, rebuilt below
+            fresh = False
+
+    if arrays is None:
+        arrays = _parse(path)
+    if cache and not fresh:
+        names, codes, starts, days, cases, lookup, lookup_starts = arrays
+        try:
+            np.savez(cache_file, names=np.array(names), codes=np.array(codes), starts=starts,
+                     days=days, cases=cases, lookup=lookup, lookup_starts=lookup_starts,
+                     size=stamp[0], mtime=stamp[1], sha1=_hash(path))
+        except OSError:
+            pass # read-only directory, just don't cache
+
+    data = CaseData(*arrays)
+    if cache:
+        _loaded[key] = (stamp, data)
+    return data
+
+
+STORE_DIR = "case_store"
+_COLUMNS = (("country", np.int16), ("day", np.int32), ("cases", np.int64))
+
+
+class CaseStore:
+    """Column files of a store written by build_store, opened with np.memmap.
+
+    country, day and cases are read-only memmaps with one entry per row. Rows
+    are grouped by country, so series() and iteration hand back zero-copy views
+    and nothing is read from disk until it is used.
+    """
+
+    def __init__(self, directory=STORE_DIR):
+        with np.load(os.path.join(directory, "index.npz")) as index:
+            self.names = [str(name) for name in index["names"]]
+            self.codes = [str(code) for code in index["codes"]]
+            self.starts = index["starts"]
+            self.source = (int(index["size"]), int(index["mtime"]))
+        rows = int(self.starts[-1])
+        for column, dtype in _COLUMNS:
+            if rows:
+                array = np.memmap(os.path.join(directory, column + ".bin"), dtype=dtype, mode="r",
+                                  shape=(rows,))
+            else:
+                array = np.zeros(0, dtype=dtype)
+            setattr(self, column, array)
+        self._ids = {name: i for i, name in enumerate(self.names)}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        # (name, days, cases) for every entity in file order
+        for i, name in enumerate(self.names):
+            rows = slice(self.starts[i], self.starts[i + 1])
+            yield name, self.day[rows], self.cases[rows]
+
+    def series(self, country):
+        # (days, cases) views for one entity
+        i = self._ids[country]
+        rows = slice(self.starts[i], self.starts[i + 1])
+        return self.day[rows], self.cases[rows]
+
+
+def build_store(directory=STORE_DIR, path=DATA_FILE):
+    """Writes the CSV at path into fixed-width column files in directory.
+
+    country.bin (int16 country id), day.bin (int32 days since EPOCH) and
+    cases.bin (int64 cumulative cases) hold one entry per row, and index.npz
+    holds the entity names, codes, first row of each entity and the CSV's
+    size/mtime so open_store can tell when it is out of date.
+    """
+    data = load(path)
+    os.makedirs(directory, exist_ok=True)
+    country = np.repeat(np.arange(len(data.names), dtype=np.int16), np.diff(data.starts))
+    for (column, dtype), values in zip(_COLUMNS, (country, data.days, data.cases)):
+        values.astype(dtype).tofile(os.path.join(directory, column + ".bin"))
+    stat = os.stat(path)
+    np.savez(os.path.join(directory, "index.npz"), names=np.array(data.names),
+             codes=np.array(data.codes), starts=data.starts, size=stat.st_size,
+             mtime=stat.st_mtime_ns)
+
+
+@instrument.timed("load")
+def open_store(directory=STORE_DIR, path=DATA_FILE):
+    # opens the store in directory, (re)building it first if path has changed
+    stat = os.stat(path)
+    try:
+        store = CaseStore(directory)
+        if store.source == (stat.st_size, stat.st_mtime_ns):
+            return store
+    except (OSError, KeyError, ValueError):
+        pass
+    build_store(directory, path)
+    return CaseStore(directory)
@@ -0,0 +1,171 @@
+# File : cli.py
+# Date : Oct 18, 2026
+# Description : Command line entry point for every model and fit. Each
+#   subcommand runs one script's computation with that script's parameters
+#   (overridable with the options below), prints its summary and plots it,
+#   importing matplotlib only when there is something to plot.
+# Note : python cli.py {sir,markov,quarantine,start-date,validation,r0,calibrate,abc}
+#   [--sims N] [--steps N] [--workers N] [--seed N] [--checkpoint FILE.npz]
+#   [--no-plot] [--no-cache] [--save FILE.npz] [--report FILE.json]
+#   --save writes the result arrays to a .npz for plotting or analysis later,
+#   --report the run's phase timings, counters and peak memory (instrument.py)
+
+import argparse
+import os
+import sys
+import numpy as np
+import instrument
+import result_cache
+
+
+def _save(path, **arrays):
+    if path is not None:
+        np.savez_compressed(path, **arrays)
+
+
+def _stats_arrays(prefix, stats):
+    # the mean and standard deviation of every RunningStats in stats (S, I, R)
+    arrays = {}
+    for name, stat in zip("SIR", stats):
+        arrays[prefix + name + "_mean"] = stat.mean
+        arrays[prefix + name + "_std"] = stat.std
+    return arrays
+
+
+def sir(args):
+    import SIR_Modeling
+    model = SIR_Modeling.SIR([4886000, 15, 0, 0, 0], [0.308, 0.25, 0, 48, 50, 52, 54])
+    sets = np.array(model.getSets(9500, 0.01))
+    print("final cases :", model.N - sets[0][-1])
+    _save(args.save, t=sets[4], S=sets[0], I=sets[1], R=sets[2], D=sets[3])
+    if args.plot:
+        model.graph(9500, 0.01, True, True)
+
+
+def markov(args):
+    import Markov_SIR
+    sims = args.sims or Markov_SIR.sims
+    seed = Markov_SIR.seed if args.seed is None else args.seed
+    t_arr, stats = Markov_SIR.run(sims=sims, steps=args.steps or Markov_SIR.steps,
+                                  seed=seed, workers=args.workers,
+                                  checkpoint=args.checkpoint)
+    print("final cases :", stats[1].mean[-1] + stats[2].mean[-1])
+    dates, cases = Markov_SIR.observed()
+    _save(args.save, t=t_arr, dates=dates, cases=cases, sims=sims, **_stats_arrays("", stats))
+    if args.plot:
+        Markov_SIR.plot(t_arr, stats, dates, cases)
+
+
+def quarantine(args):
+    import Markov_Q_comp
+    sims = args.sims or Markov_Q_comp.sims
+    seed = Markov_Q_comp.seed if args.seed is None else args.seed
+    steps = args.steps or Markov_Q_comp.steps
+    t_arr, stats, differences = Markov_Q_comp.run(sims=sims, steps=steps, seed=seed,
+                                                  workers=args.workers)
+    Markov_Q_comp.summary(differences, sims)
+    arrays = {"t": t_arr, "sims": sims}
+    for b, (level, change) in enumerate(zip(stats, differences)):
+        arrays.update(_stats_arrays("level%d_" % b, level))
+        arrays["level%d_change_mean" % b] = change.mean
+        arrays["level%d_change_std" % b] = change.std
+    _save(args.save, **arrays)
+    if args.plot:
+        Markov_Q_comp.plot(t_arr, stats)
+
+
+def start_date(args):
+    import Markov_start_date
+    times, extinct = Markov_start_date.run(sims=args.sims or Markov_start_date.sims,
+                                           seed=args.seed, workers=args.workers)
+    Markov_start_date.summary(times, extinct)
+    _save(args.save, times=times, extinct=extinct)
+    if args.plot:
+        Markov_start_date.plot(times)
+
+
+def validation(args):
+    import Markov_SIR_validation
+    t_arr, delta_I, delta_R = Markov_SIR_validation.run(
+        steps=args.steps or Markov_SIR_validation.steps, seed=args.seed)
+    print("largest chance of a transition in one tick :", np.max(delta_I + delta_R))
+    _save(args.save, t=t_arr, delta_I=delta_I, delta_R=delta_R)
+    if args.plot:
+        Markov_SIR_validation.plot(t_arr, delta_I, delta_R)
+
+
+def r0(args):
+    import R0_extraction
+    dates, log_cases, A, B, sigma_A, sigma_B = R0_extraction.march_fit()
+    R0_extraction.summary(A, B, sigma_A, sigma_B, R0_extraction.best_window())
+    _save(args.save, dates=dates, log_cases=log_cases, fit=[A, B, sigma_A, sigma_B])
+    if args.plot:
+        R0_extraction.plot(dates, log_cases, A, B)
+
+
+def calibrate(args):
+    import calibration
+    days, cases = calibration.load_cases()
+    # --sims gives the number of bootstrap refits for the intervals
+    fit = calibration.calibrate(days, cases, workers=args.workers, seed=args.seed,
+                                bootstrap_samples=args.sims or 0)
+    calibration.report(fit)
+    _save(args.save, params=np.array(fit["params"]), x=fit["x"], ci=fit["ci"], cost=fit["cost"],
+          at_bound=fit["at_bound"])
+
+
+def abc(args):
+    import Markov_abc
+    fit = Markov_abc.abc_smc(particles=args.sims or 1000, seed=args.seed, workers=args.workers)
+    Markov_abc.summary(fit)
+    if fit["particles"] is not None:
+        _save(args.save, params=np.array(fit["params"]), particles=fit["particles"],
+              weights=fit["weights"], distances=fit["distances"], tolerances=fit["tolerances"])
+
+
+COMMANDS = {"sir": (sir, "deterministic SIRD model (SIR_Modeling.py)"),
+            "markov": (markov, "Markov SIR ensemble against NZ cases (Markov_SIR.py)"),
+            "quarantine": (quarantine, "quarantine levels compared (Markov_Q_comp.py)"),
+            "start-date": (start_date, "first case date (Markov_start_date.py)"),
+            "validation": (validation, "tick size check (Markov_SIR_validation.py)"),
+            "r0": (r0, "growth rate fits (R0_extraction.py)"),
+            "calibrate": (calibrate, "least squares fit of the SIRD model (calibration.py)"),
+            "abc": (abc, "ABC-SMC posterior of the Markov model (Markov_abc.py)")}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Runs the epidemic models and fits.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, (func, description) in COMMANDS.items():
+        command = commands.add_parser(name, help=description, description=description)
+        command.set_defaults(func=func)
+        command.add_argument("--sims", type=int, help="replicates to run (default: the script's)")
+        command.add_argument("--steps", type=int, help="ticks to run (default: the script's)")
+        command.add_argument("--workers", type=int, help="processes to use (default: every core)")
+        command.add_argument("--seed", type=int, help="seed for reproducible runs")
+        command.add_argument("--checkpoint", help="markov only: .npz to save to and resume from")
+        command.add_argument("--no-plot", dest="plot", action="store_false", help="skip the plot")
+        command.add_argument("--no-cache", dest="cache", action="store_false",
+                             help="always recompute instead of using result_cache")
+        command.add_argument("--save", help="write the result arrays to this .npz")
+        command.add_argument("--report", help="write a JSON report of timings, counters and memory")
+    args = parser.parse_args(argv)
+    for option in ("save", "checkpoint", "report"): # relative to where the command was run
+        if getattr(args, option) is not None:
+            setattr(args, option, os.path.abspath(getattr(args, option)))
+    os.chdir(os.path.dirname(os.path.abspath(__file__))) # the scripts read data from here
+    result_cache.configure(enabled=args.cache)
+    if args.report is None:
+        args.func(args)
+        return
+    instrument.start(args.command)
+    try:
+        args.func(args)
+    finally:
+        report = instrument.stop()
+        report["argv"] = sys.argv[1:] if argv is None else list(argv)
+        instrument.write(report, args.report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+# File : compartments.py
+# Date : Oct 18, 2026
+# Description : Compartmental models declared once as a list of compartments
+#   and the transitions between them, with the deterministic RK4 integrator
+#   and the stochastic simulator both generated from the same declaration.
+#   sir(), sird() and seir() build the usual models and stratify() splits any
+#   of them into groups (e.g. ages) mixing through a contact matrix.
+# Note : rates are per day. A transition with a "via" compartment is a
+#   contact (mass action) transition: its rate is also multiplied by X[via] / N
+#   and by the intervention multiplier in effect
+
+import numpy as np
+import Markov_engine
+
+
+class Model:
+    """Compartments and the transitions between them.
+
+    transitions is a list of (source, target, rate, via, scale) tuples, via
+    and scale being optional. source -> target happens at
+    rate * scale * X[source] per day, times factor * X[via] / N if via is given,
+    where N is the whole population and factor the contact multiplier of the
+    intervention schedule. rate names a parameter whose value is passed in
+    when the model is run, so one model covers every parameter set. target can
+    be None for transitions that only remove from source.
+
+    The transitions are kept as index arrays and a stoichiometry matrix
+    (change[j] is what transition j adds to each compartment), so propensities
+    are computed for every transition and every replicate at once.
+    """
+
+    def __init__(self, compartments, transitions):
+        self.compartments = list(compartments)
+        self.index = {name: i for i, name in enumerate(self.compartments)}
+        self.transitions = [tuple(t) + (None, 1.0)[len(t) - 3:] for t in transitions]
+        self.params = list(dict.fromkeys(t[2] for t in self.transitions))
+
+        self.source = np.array([self.index[t[0]] for t in self.transitions], dtype=np.int64)
+        self.via = np.array([-1 if t[3] is None else self.index[t[3]] for t in self.transitions],
+                            dtype=np.int64)
+        self.contact = np.flatnonzero(self.via >= 0)
+        self.contact_via = self.via[self.contact]
+        self.scale = np.array([float(t[4]) for t in self.transitions])
+        self.param_index = np.array([self.params.index(t[2]) for t in self.transitions])
+        self.change = np.zeros((len(self.transitions), len(self.compartments)), dtype=np.int64)
+        for j, (source, target, *rest) in enumerate(self.transitions):
+            self.change[j, self.index[source]] -= 1
+            if target is not None:
+                self.change[j, self.index[target]] += 1
+
+    def rates(self, params):
+        # (transitions, ...) array of rates from a dict of parameter values,
+        # which can be scalars or arrays (broadcast together)
+        values = np.broadcast_arrays(*[np.asarray(params[p], dtype=np.float64)
+                                       for p in self.params])
+        scale = self.scale.reshape((-1,) + (1,) * values[0].ndim)
+        return np.stack(values)[self.param_index] * scale
+
+    def propensities(self, X, rates, mixing):
+        # rate of every transition in state X, with compartments and transitions
+        # along the first axis (so each is a contiguous row); mixing is the
+        # contact multiplier over the population, factor / N
+        a = rates * X[self.source]
+        if self.contact.size:
+            a[self.contact] *= X[self.contact_via] * mixing
+        return a
+
+    def derivative(self, X, rates, mixing):
+        # dX/dt of the deterministic (mean-field) model
+        return self.change.T @ self.propensities(X, rates, mixing)
+
+    def integrate(self, x0, params, nsteps, dt=1, every=1, days=(), factors=(1.0,)):
+        """Deterministic solution by classic RK4 for many parameter sets at once.
+
+        x0 is the starting state, (compartments,) or with leading axes for
+        several sets, and params maps every rate name to a scalar or array.
+        The contact multiplier is factors[0] before days[0] and factors[j]
+        from days[j - 1] on; days and factors can also have leading axes to
+        give each set its own schedule. It is taken at the start of every step
+        like SIR.advance does. Everything is broadcast together and flattened
+        into n sets.
+
+        Returns an (n, compartments, nsteps // every + 1) array sampled every
+        every steps.
+        """
+        x0 = np.asarray(x0, dtype=np.float64)
+        rates = np.moveaxis(self.rates(params), 0, -1)
+        days = np.asarray(days, dtype=np.float64)
+        factors = np.asarray(factors, dtype=np.float64)
+        shape = np.broadcast_shapes(x0.shape[:-1], rates.shape[:-1], days.shape[:-1],
+                                    factors.shape[:-1])
+        n = int(np.prod(shape))
+        X = np.broadcast_to(x0, shape + x0.shape[-1:]).reshape(n, -1).T.copy()
+        rates = np.broadcast_to(rates, shape + rates.shape[-1:]).reshape(n, -1).T.copy()
+        days = np.broadcast_to(days, shape + days.shape[-1:]).reshape(n, -1)
+        factors = np.broadcast_to(factors, shape + factors.shape[-1:]).reshape(n, -1)
+        N = np.sum(X, axis=0)
+        # every set's change days in order, how many of them have passed and
+        # the next one, so the multiplier is only looked up again when a set
+        # passes a change (memory stays at a few values per set)
+        rows = np.arange(n)
+        changes = np.concatenate([np.sort(days, axis=1), np.full((n, 1), np.inf)], axis=1)
+        passed = np.zeros(n, dtype=np.int64)
+        mixing = factors[:, 0] / N
+
+        out = np.zeros((n, X.shape[0], nsteps // every + 1))
+        out[:, :, 0] = X.T
+        for i in range(nsteps):
+            t = i * dt
+            if np.any(changes[rows, passed] <= t):
+                while True:
+                    due = changes[rows, passed] <= t
+                    if not due.any():
+                        break
+                    passed += due
+                mixing = factors[rows, passed] / N
+            k1 = self.derivative(X, rates, mixing)
+            k2 = self.derivative(X + 0.5 * dt * k1, rates, mixing)
+            k3 = self.derivative(X + 0.5 * dt * k2, rates, mixing)
+            k4 = self.derivative(X + dt * k3, rates, mixing)
+            X = X + dt / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+            if (i + 1) % every == 0:
+                out[:, :, (i + 1) // every] = X.T
+        return out
+
+    def simulate(self, x0, params, steps, sims, t0=1, schedule=(), start_tick=0, seed=None,
+                 block=1024, mode="tick", epsilon=0.03, record=None):
+        """Stochastic runs of the model on Markov_engine's event loop, the one
+        Markov_engine.simulate runs SIR on.
+
+        Ticks are 1 / t0 of a day. x0 gives the starting counts, the same for
+        every replicate or one row each, and params the rates (per replicate
+        if given as arrays of length sims). schedule, start_tick, seed, mode,
+        epsilon and record work as in Markov_engine.simulate: "tick" fires at
+        most one transition per tick, "ssa" is Gillespie's direct method and
+        "tau" leaps over many transitions at once.
+
+        Returns a (compartments, sims, len(grid)) array, so the compartments
+        unpack in order, e.g. S, E, I, R = seir().simulate(...).
+        """
+        if mode not in ("tick", "ssa", "tau"):
+            raise ValueError("mode must be \"tick\", \"ssa\" or \"tau\"")
+        width = len(self.compartments)
+        rates = self.rates(params) / t0
+        rates = np.broadcast_to(rates.reshape(rates.shape[0], -1), (rates.shape[0], sims))
+        X0 = np.broadcast_to(np.asarray(x0, dtype=np.int64), (sims, width)).T
+        N = np.sum(X0, axis=0).astype(np.float64)
+
+        def propensities(X, factor):
+            return self.propensities(X, rates, factor / N)
+
+        return Markov_engine.run_chain(X0, propensities, self.change, steps, schedule, start_tick,
+                                       seed, block, mode, epsilon, record)
+
+
+def sir():
+    # S -> I by contact with I, I -> R
+    return Model("SIR", [("S", "I", "beta", "I"), ("I", "R", "gamma")])
+
+
+def sird():
+    # SIR_Modeling's model: S -> I by contact with I, I -> R and I -> D
+    return Model("SIRD", [("S", "I", "beta", "I"), ("I", "R", "gamma"), ("I", "D", "drate")])
+
+
+def seir():
+    # S -> E by contact with I, E -> I after a mean 1 / sigma days, I -> R
+    return Model("SEIR", [("S", "E", "beta", "I"), ("E", "I", "sigma"), ("I", "R", "gamma")])
+
+
+def stratify(model, groups, contact):
+    """Splits every compartment of model into groups (e.g. age bands).
+
+    Compartment X becomes X_g for each group name g. Transitions without a
+    contact compartment happen within each group. A contact transition
+    source -> target via V becomes one transition per pair of groups (g, h):
+    source_g -> target_g via V_h with its scale multiplied by contact[g][h],
+    the relative rate at which group g meets group h.
+    """
+    groups = [str(g) for g in groups]
+    contact = np.asarray(contact, dtype=np.float64)
+    compartments = [c + "_" + g for c in model.compartments for g in groups]
+    transitions = []
+    for source, target, rate, via, scale in model.transitions:
+        for a, g in enumerate(groups):
+            into = None if target is None else target + "_" + g
+            if via is None:
+                transitions.append((source + "_" + g, into, rate, None, scale))
+                continue
+            for b, h in enumerate(groups):
+                if contact[a, b]:
+                    transitions.append((source + "_" + g, into, rate, via + "_" + h,
+                                        scale * contact[a, b]))
+    return Model(compartments, transitions)
@@ -0,0 +1,126 @@
+# File : growth_fit.py
+# Date : Oct 18, 2026
+# Description : Least-squares fits of log(cases) = A + B * day for many
+#   countries and many windows at once, the same fit R0_extraction.py does for
+#   one window of New Zealand's data. Window sums come from cumulative sums, so
+#   every window costs the same handful of array operations. The most linear
+#   window (highest R^2) is picked for each country and turned into
+#   R0 = B * serial_interval.
+
+import numpy as np
+import case_data
+import instrument
+
+TABLE = [("country", "U64"), ("start_day", np.int32), ("length", np.int32),
+         ("A", np.float64), ("B", np.float64), ("sigma_A", np.float64),
+         ("sigma_B", np.float64), ("r2", np.float64), ("R0", np.float64),
+         ("sigma_R0", np.float64)]
+
+
+def regress(n, sum_x, sum_x_squared, sum_y, sum_xy, sum_y_squared):
+    """Closed-form straight line fit from the sums of the points.
+
+    Takes scalars or arrays (one fit per element) and returns A, B, sigma_A,
+    sigma_B and R^2, with sigma_y estimated from the residuals.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        delta = n * sum_x_squared - sum_x ** 2
+        A = (sum_x_squared * sum_y - sum_x * sum_xy) / delta
+        B = (n * sum_xy - sum_x * sum_y) / delta
+
+        residual = np.maximum(sum_y_squared - A * sum_y - B * sum_xy, 0)
+        sigma_y = np.sqrt(residual / (n - 2))
+        sigma_A = sigma_y * np.sqrt(sum_x_squared / delta)
+        sigma_B = sigma_y * np.sqrt(n / delta)
+
+        # flat windows have no variation to explain, leave their R^2 undefined
+        total = sum_y_squared - sum_y ** 2 / n
+        r2 = np.where(total > 1e-10 * np.abs(sum_y_squared), 1 - residual / total, np.nan)
+    return A, B, sigma_A, sigma_B, r2
+
+
+@instrument.timed("fit")
+def fit(x, y):
+    # fit of y = A + B * x along the last axis of x and y
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if instrument.enabled():
+        instrument.count(fits=np.prod(x.shape[:-1], dtype=np.int64))
+    return regress(x.shape[-1], np.sum(x, axis=-1), np.sum(x * x, axis=-1), np.sum(y, axis=-1),
+                   np.sum(x * y, axis=-1), np.sum(y * y, axis=-1))
+
+
+@instrument.timed("fit")
+def fit_windows(days, cases, starts, lengths, min_cases=1):
+    """Fits log(cases) against days over every window of consecutive rows.
+
+    days and cases hold the rows of every country back to back, with country i
+    in rows starts[i]:starts[i + 1]. Windows of each length in lengths are
+    tried at every row, but never cross into the next country or include a
+    row with fewer than min_cases cases. Returns a dict of arrays with the
+    country index, first row and length of each window and its fit.
+    """
+    x = np.asarray(days, dtype=np.float64)
+    counts = np.asarray(cases, dtype=np.float64)
+    good = counts >= max(min_cases, 1)
+    y = np.log(np.where(good, counts, 1))
+
+    def cumulative(values):
+        return np.concatenate([[0], np.cumsum(values)])
+
+    sums = [cumulative(v) for v in (x, x * x, y, x * y, y * y)]
+    bad = cumulative(~good)
+    country = np.repeat(np.arange(len(starts) - 1), np.diff(starts))
+    ends = np.asarray(starts)[1:][country] # first row past each row's country
+
+    found = {"country": [], "start": [], "length": [], "fit": []}
+    rows = np.arange(x.size)
+    for length in lengths:
+        ok = (rows + length <= ends) & (length > 2)
+        first = rows[ok]
+        last = first + length
+        first = first[bad[last] == bad[first]]
+        last = first + length
+        window = [s[last] - s[first] for s in sums]
+        found["country"].append(country[first])
+        found["start"].append(first)
+        found["length"].append(np.full(first.size, length))
+        found["fit"].append(regress(length, *window))
+
+    result = {key: np.concatenate(found[key]) for key in ("country", "start", "length")}
+    for n, key in enumerate(("A", "B", "sigma_A", "sigma_B", "r2")):
+        result[key] = np.concatenate([f[n] for f in found["fit"]])
+    if instrument.enabled():
+        instrument.count(fits=result["B"].size)
+    return result
+
+
+def best_windows(windows):
+    # index of the growing (B > 0) window with the highest R^2 for each country
+    usable = np.flatnonzero((windows["B"] > 0) & np.isfinite(windows["r2"]))
+    order = usable[np.lexsort((windows["r2"][usable], windows["country"][usable]))]
+    country = windows["country"][order]
+    last = np.append(country[1:] != country[:-1], True)
+    return order[last]
+
+
+def growth_table(store=None, lengths=range(7, 22), serial_interval=4, min_cases=10):
+    """Best-window growth rate and R0 for every country in a case store.
+
+    store defaults to case_data.open_store(). Returns a structured array with
+    the TABLE fields, one row per country that has a usable window, where
+    start_day is the window's first day since case_data.EPOCH.
+    """
+    if store is None:
+        store = case_data.open_store()
+    windows = fit_windows(store.day, store.cases, store.starts, lengths, min_cases)
+    best = best_windows(windows)
+
+    table = np.zeros(best.size, dtype=TABLE)
+    table["country"] = [store.names[i] for i in windows["country"][best]]
+    table["start_day"] = np.asarray(store.day)[windows["start"][best]]
+    for key in ("length", "A", "B", "sigma_A", "sigma_B", "r2"):
+        table[key] = windows[key][best]
+    table["R0"] = table["B"] * serial_interval
+    table["sigma_R0"] = table["sigma_B"] * serial_interval
+    return table
@@ -0,0 +1,150 @@
+# File : instrument.py
+# Date : Oct 18, 2026
+# Description : Opt-in instrumentation of model runs. While a report is
+#   started, the entry points add the wall time of each phase (load, simulate,
+#   aggregate, fit, plot) and counters (ticks, events, no-op ticks,
+#   extinctions, ...) to it, and stop() returns them with the peak memory of
+#   this process and its workers as a JSON-ready dict. When no report is
+#   started every hook is a single check of a module global, and the
+#   counters are worked out from results the code has anyway, never inside
+#   the simulation loops.
+# Note : python cli.py <command> --report run.json writes one report per run;
+#   batches run in worker processes send their counters back with their results
+
+from contextlib import contextmanager
+import functools
+import json
+import sys
+import time
+
+_report = None # the report being gathered, None when instrumentation is off
+
+
+def enabled():
+    return _report is not None
+
+
+def start(entry=None):
+    # starts a fresh report for a run of entry (e.g. a cli.py subcommand)
+    global _report
+    _report = {"entry": entry, "started": time.time(), "phases": {}, "counters": {},
+               "_stack": [], "_clock": time.perf_counter()}
+    _report["_since"] = _report["_clock"]
+
+
+def stop():
+    """Ends the current report and returns it (None if none was started).
+
+    The report holds the entry, the total wall time, the seconds spent in each
+    phase, the counters and the peak resident memory in MB of this process and
+    of its finished worker processes (None for both on Windows).
+    """
+    global _report
+    report, _report = _report, None
+    if report is None:
+        return None
+    return {"entry": report["entry"], "started": report["started"],
+            "seconds": time.perf_counter() - report["_clock"], "phases": report["phases"],
+            "counters": report["counters"], "peak_mb": _peak(),
+            "peak_workers_mb": _peak(children=True)}
+
+
+def write(report, path):
+    with open(path, "w") as file:
+        json.dump(report, file, indent=2, sort_keys=True)
+        file.write("\n")
+
+
+@contextmanager
+def phase(name):
+    # adds the time spent in the block to phase name. Phases nest but don't
+    # overlap: while an inner phase runs the outer one's clock is stopped
+    if _report is None:
+        yield
+        return
+    report = _report
+    _charge(report)
+    report["_stack"].append(name)
+    try:
+        yield
+    finally:
+        _charge(report)
+        report["_stack"].pop()
+
+
+def timed(name):
+    # decorator form of phase, for whole functions
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _report is None:
+                return func(*args, **kwargs)
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(**counters):
+    # adds to the named counters (only call while enabled() to skip the work
+    # of computing them)
+    if _report is None:
+        return
+    totals = _report["counters"]
+    for name, value in counters.items():
+        totals[name] = totals.get(name, 0) + int(value)
+
+
+def collect(func, *args):
+    # calls func(*args) under a report of its own and returns (result, its
+    # counters), so batches run in worker processes can send their counters
+    # back; the parent times the batches as a whole
+    global _report
+    outer = _report
+    start()
+    try:
+        result = func(*args)
+    finally:
+        counters = _report["counters"]
+        _report = outer
+    return result, counters
+
+
+def worker(func):
+    # func as it should be sent to a worker process: when enabled it comes back
+    # with its counters, which gather() adds to this report
+    if _report is None:
+        return func
+    return functools.partial(collect, func)
+
+
+def gather(results):
+    # the results of calls to a worker(func), with their counters merged here
+    if _report is None:
+        return results
+    for result, counters in results:
+        count(**counters)
+    return [result for result, counters in results]
+
+
+def _charge(report):
+    # adds the time since the last change of phase to the innermost open one
+    now = time.perf_counter()
+    if report["_stack"]:
+        name = report["_stack"][-1]
+        report["phases"][name] = report["phases"].get(name, 0.0) + now - report["_since"]
+    report["_since"] = now
+
+
+def _peak(children=False):
+    # peak resident memory in MB of this process (or of its finished workers),
+    # None where the resource module is missing (Windows)
+    try:
+        import resource
+    except ImportError:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    if sys.platform != "darwin":
+        peak *= 1024 # kilobytes on Linux, bytes on macOS
+    return peak / 2 ** 20
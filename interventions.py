@@ -0,0 +1,103 @@
+# File : interventions.py
+# Date : Oct 18, 2026
+# Description : Intervention schedules shared by the ODE and Markov models. A
+#   Schedule is a piecewise-constant contact multiplier kept as a breakpoint
+#   table (the times it changes at and the factor of every piece), built once
+#   instead of being worked out with if/elif chains on every step. Looking up
+#   a factor is a binary search, so any number of interventions cost about
+#   the same per step as none, and solvers can step exactly onto the
+#   breakpoints.
+# Note : times are in whatever unit the model steps in (days for SIR_Modeling,
+#   ticks for the Markov models); Schedule.scaled converts between them
+
+import bisect
+import numpy as np
+
+
+class Schedule:
+    """Contact multiplier over time: 1 until the first change, then each
+    (time, factor) change sets it from that time on.
+
+    Changes can be given in any order; of several at the same time the last
+    one given wins. A Schedule iterates as its (time, factor) changes, so it
+    can be passed wherever a list of pairs is taken.
+    """
+
+    def __init__(self, changes=()):
+        times = []
+        factors = [1.0]
+        for time, factor in sorted(((float(t), float(f)) for t, f in changes), key=lambda c: c[0]):
+            if times and time == times[-1]:
+                factors[-1] = factor
+            else:
+                times.append(time)
+                factors.append(factor)
+        self._times = times # python lists for lookups one time at a time
+        self._factors = factors
+        self.times = np.array(times)
+        self.factors = np.array(factors)
+
+    @classmethod
+    def of(cls, schedule):
+        # schedule as a Schedule, if it isn't one already
+        return schedule if isinstance(schedule, cls) else cls(schedule)
+
+    def __iter__(self):
+        return iter(zip(self._times, self._factors[1:]))
+
+    def __len__(self):
+        return len(self._times)
+
+    def __add__(self, changes):
+        # this schedule with more changes on top
+        return Schedule(list(self) + list(changes))
+
+    def __call__(self, time):
+        # factor in effect at time (a number or an array of times)
+        if isinstance(time, (int, float)) or np.ndim(time) == 0:
+            return self._factors[bisect.bisect_right(self._times, time)]
+        return self.factors[np.searchsorted(self.times, time, side="right")]
+
+    def scaled(self, unit):
+        # the same schedule with every time multiplied by unit (e.g. days to ticks)
+        return Schedule((time * unit, factor) for time, factor in self)
+
+    def breakpoints(self, start, end):
+        # times strictly between start and end where the factor changes
+        a = bisect.bisect_right(self._times, start)
+        b = bisect.bisect_left(self._times, end)
+        return self.times[a:b]
+
+    def segments(self, start, end):
+        # [(a, b, factor), ...] pieces covering start to end
+        edges = [start] + self.breakpoints(start, end).tolist() + [end]
+        return [(a, b, self(a)) for a, b in zip(edges[:-1], edges[1:])]
+
+    def local(self, start, steps):
+        """The table the Markov models step through for a run of steps ticks
+        from tick start: the local ticks the factor changes at, the factor of
+        every segment (one more) and the tick each segment ends at.
+        """
+        a = bisect.bisect_right(self._times, start)
+        b = bisect.bisect_left(self._times, start + steps)
+        bounds = (self.times[a:b] - start).astype(np.int64)
+        return bounds, self.factors[a:b + 1], np.append(bounds, steps)
+
+
+def piecewise(times, factors, t):
+    """Vectorized lookup of many schedules at the times t.
+
+    times (..., k) are each schedule's change times and factors (..., k + 1)
+    its factors, factors[..., j] being in effect once j of the times have
+    passed (from the j-th change on, for times in increasing order). Returns
+    the factors in effect at every t, shape (..., len(t)).
+    """
+    times = np.asarray(times, dtype=np.float64)
+    factors = np.asarray(factors, dtype=np.float64)
+    t = np.asarray(t, dtype=np.float64)
+    # count the passed times one change at a time, so memory goes with the
+    # output and not with the output times the number of changes
+    index = np.zeros(times.shape[:-1] + t.shape, dtype=np.int64)
+    for j in range(times.shape[-1]):
+        index += times[..., j, None] <= t
+    return np.take_along_axis(factors, index, axis=-1)
@@ -0,0 +1,157 @@
+# File : render.py
+# Date : Oct 18, 2026
+# Description : Headless figures from saved results. Renders the .npz files
+#   written by cli.py --save with the Agg backend (no display, no plt.show),
+#   many at a time in a process pool. Long series are decimated to the figure's
+#   pixel width before plotting, keeping every column's min and max so peaks
+#   survive, and the +/-1 standard deviation bands come from the saved means
+#   and standard deviations instead of the replicates.
+# Note : python render.py results/*.npz [--out DIR] [--format png] [--workers N]
+#   each figure goes next to its .npz (or into --out) with the same name
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import os
+import numpy as np
+import instrument
+
+WIDTH, HEIGHT, DPI = 6.4, 4.8, 100 # matplotlib's default figure size
+
+
+def decimate(x, *ys, points=2000):
+    """Thins x and every series in ys to about points samples.
+
+    The samples are split into points / 2 equal buckets and each bucket keeps
+    its first and last sample and, for every series, the samples where it is
+    lowest and highest, so a line drawn through what is left looks the same at
+    that resolution. Returns x and the series at the kept samples.
+    """
+    x = np.asarray(x)
+    ys = [np.asarray(y) for y in ys]
+    n = x.size
+    buckets = max(points // 2, 1)
+    if n <= points:
+        return (x,) + tuple(ys)
+    size = -(-n // buckets)
+    starts = np.arange(0, n, size)
+    keep = [starts, np.minimum(starts + size, n) - 1]
+    pad = starts.size * size - n
+    for y in ys:
+        blocks = np.pad(y, (0, pad), mode="edge").reshape(-1, size)
+        keep += [starts + blocks.argmin(axis=1), starts + blocks.argmax(axis=1)]
+    index = np.unique(np.concatenate(keep))
+    return (x[index],) + tuple(y[index] for y in ys)
+
+
+def _cases(axes, saved, prefix, points, color, label):
+    # mean cases (I + R) with a band of the summed standard deviations, as
+    # Markov_SIR.plot draws it
+    cases = saved[prefix + "I_mean"] + saved[prefix + "R_mean"]
+    dev = saved[prefix + "I_std"] + saved[prefix + "R_std"]
+    t, cases, lower, upper = decimate(saved["t"], cases, cases - dev, cases + dev, points=points)
+    axes.plot(t, cases, color, label=label)
+    return t, lower, upper
+
+
+def _markov(axes, saved, points):
+    t, lower, upper = _cases(axes, saved, "", points, "y", "simulated cases")
+    axes.plot(saved["dates"], saved["cases"], "o", label="confirmed cases")
+    axes.fill_between(t, upper, lower, facecolor="yellow", alpha=0.5)
+    axes.set(xlabel="time (days)", ylabel="cases", title="Total COVID-19 Cases in New Zealand")
+    axes.legend()
+
+
+def _quarantine(axes, saved, points):
+    for b, (color, label) in enumerate([("b", "None"), ("g", "Minimal"), ("r", "Moderate"),
+                                        ("k", "Strict")]):
+        t, lower, upper = _cases(axes, saved, "level%d_" % b, points, color, label)
+        axes.fill_between(t, upper, lower, facecolor=color, alpha=0.2)
+    axes.set(xlabel="time (days)", ylabel="cases",
+             title="Effects of Differing Levels of Quarantine")
+    axes.legend()
+
+
+def _start_date(axes, saved, points):
+    times = saved["times"]
+    axes.hist(times[~np.isnan(times)].astype(int))
+    axes.set(xlabel="time (days)", ylabel="occurrences",
+             title="Simulated Date of First COVID-19 Case \n"
+                   " (given in days before Feb. 28, first confirmed case)")
+
+
+def _validation(axes, saved, points):
+    t, delta_I, delta_R = decimate(saved["t"], saved["delta_I"], saved["delta_R"], points=points)
+    axes.plot(t, delta_I, "g", label="chance of infection")
+    axes.plot(t, delta_R, "r", label="chance of recovery")
+    t, both = decimate(saved["t"], saved["delta_I"] + saved["delta_R"], points=points)
+    axes.plot(t, both, "y", label="sum of both")
+    axes.set(xlabel="time (days)", ylabel="probability")
+    axes.legend()
+
+
+def _r0(axes, saved, points):
+    A, B = saved["fit"][:2]
+    x = np.linspace(1, 29, 1000)
+    axes.plot(saved["dates"], saved["log_cases"], "o")
+    axes.plot(x, A + B * x, "r")
+    axes.set(xlabel="days", ylabel="log(cases)")
+
+
+def _sir(axes, saved, points):
+    t, S, I, R, D = decimate(saved["t"], saved["S"], saved["I"], saved["R"], saved["D"],
+                             points=points)
+    for y, label in ((S, "S"), (I, "I"), (R, "R"), (D, "D")):
+        axes.plot(t, y, label=label)
+    axes.set(xlabel="Days", ylabel="Count")
+    axes.legend()
+
+
+# which figure a saved file gets, by an array only that subcommand saves
+KINDS = (("level0_S_mean", _quarantine), ("S_mean", _markov), ("times", _start_date),
+         ("delta_I", _validation), ("log_cases", _r0), ("D", _sir))
+
+
+def render(path, out=None, fmt="png", dpi=DPI):
+    """Draws the figure for one saved result and writes it.
+
+    out is the file to write (default: path with fmt as its extension).
+    Returns out.
+    """
+    from matplotlib.figure import Figure # renders with Agg, never opens a window
+    out = out or os.path.splitext(path)[0] + "." + fmt
+    with np.load(path) as saved:
+        draw = next((draw for key, draw in KINDS if key in saved), None)
+        if draw is None:
+            raise ValueError(path + " is not a result saved by cli.py")
+        figure = Figure(figsize=(WIDTH, HEIGHT), dpi=dpi)
+        draw(figure.add_subplot(), saved, 2 * int(WIDTH * dpi))
+    figure.savefig(out)
+    return out
+
+
+def render_all(paths, out=None, fmt="png", dpi=DPI, workers=None):
+    # renders every saved result in parallel, into the directory out if given;
+    # returns the written files in the order of paths
+    outs = [None if out is None else os.path.join(out, os.path.splitext(os.path.basename(path))[0]
+                                                  + "." + fmt) for path in paths]
+    n = len(paths)
+    with instrument.phase("plot"):
+        if workers == 1:
+            return list(map(render, paths, outs, [fmt] * n, [dpi] * n))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(render, paths, outs, [fmt] * n, [dpi] * n))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Renders saved results to figures, headless.")
+    parser.add_argument("paths", nargs="+", help=".npz files written by cli.py --save")
+    parser.add_argument("--out",
+                        help="directory to write the figures to (default: beside each file)")
+    parser.add_argument("--format", default="png", help="figure format, e.g. png, pdf or svg")
+    parser.add_argument("--dpi", type=int, default=DPI, help="figure resolution")
+    parser.add_argument("--workers", type=int, help="processes to use (default: every core)")
+    args = parser.parse_args()
+    if args.out is not None:
+        os.makedirs(args.out, exist_ok=True)
+    for written in render_all(args.paths, args.out, args.format, args.dpi, args.workers):
+        print(written)
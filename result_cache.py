@@ -0,0 +1,247 @@
+# File : result_cache.py
+# Date : Oct 18, 2026
+# Description : Content-addressed cache of simulation results. A result is
+#   keyed on a SHA-256 of the function's name, every argument it was called
+#   with (parameters, schedule, mode, seed, ...) and the source of the
+#   modules it depends on, so editing the model code never serves a stale
+#   result. Results are pickled to one file per key in DIRECTORY, the least
+#   recently used files are evicted past MAX_BYTES, and the pickles of recent
+#   results are also kept in memory for repeated calls in one process. Every
+#   hit hands back a fresh copy, so callers can change what they get.
+# Note : runs with seed=None are random and never cached; configure(enabled=
+#   False) (or cli.py --no-cache) turns caching off, e.g. for benchmarks
+
+import collections
+import functools
+import hashlib
+import importlib.util
+import inspect
+import os
+import pickle
+import numpy as np
+import instrument
+
+DIRECTORY = "result_cache"
+MAX_BYTES = 1 << 30 # on disk
+MEMO_BYTES = 1 << 28 # in memory
+
+_enabled = True
+_memo = collections.OrderedDict() # key -> pickled result, least recently used first
+_memo_bytes = 0
+_disk_bytes = None # size of the files in DIRECTORY, None until it is first scanned
+_sources = {} # module name -> hash of its source file
+
+
+class Uncacheable(TypeError):
+    # raised for arguments the cache can't turn into a key
+    pass
+
+
+def configure(enabled=None, directory=None, max_bytes=None, memo_bytes=None):
+    # changes the cache settings given (the rest are left alone)
+    global _enabled, DIRECTORY, MAX_BYTES, MEMO_BYTES, _disk_bytes
+    if enabled is not None:
+        _enabled = enabled
+    if directory is not None:
+        DIRECTORY = directory
+        _disk_bytes = None
+    if max_bytes is not None:
+        MAX_BYTES = max_bytes
+    if memo_bytes is not None:
+        MEMO_BYTES = memo_bytes
+
+
+def key(name, params, sources=()):
+    # hex digest identifying a call of name with params (a dict), under the
+    # current source of the modules in sources
+    digest = hashlib.sha256()
+    _feed(digest, (name, params, [_source(module) for module in sources]))
+    return digest.hexdigest()
+
+
+def cached(name, compute, params, sources=()):
+    """compute()'s result for params, from the cache if it has it.
+
+    name and params (a dict of everything the result depends on) make the
+    key together with the source of the modules named in sources. When
+    caching is off or params can't be keyed, compute() is just called.
+    """
+    if not _enabled:
+        return compute()
+    try:
+        digest = key(name, params, sources)
+    except Uncacheable:
+        return compute()
+
+    blob = _memo.get(digest)
+    if blob is not None:
+        _memo.move_to_end(digest)
+    else:
+        blob = _read(digest)
+    if blob is not None:
+        instrument.count(cache_hits=1)
+        _remember(digest, blob)
+        return pickle.loads(blob)
+
+    instrument.count(cache_misses=1)
+    result = compute()
+    blob = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+    _remember(digest, blob)
+    _write(digest, blob)
+    return result
+
+
+def memoize(name, sources=(), ignore=("workers",)):
+    """Decorator caching a function's results with cached().
+
+    The key is every argument the function is called with (defaults filled
+    in) except those in ignore, which must not change the result. Calls with
+    a seed argument of None are random and not cached.
+    """
+    def decorate(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = {k: v for k, v in bound.arguments.items() if k not in ignore}
+            if "seed" in params and params["seed"] is None:
+                return func(*args, **kwargs)
+            return cached(name, functools.partial(func, *args, **kwargs), params, sources)
+        return wrapper
+    return decorate
+
+
+def clear(memory=True, disk=True):
+    # empties the in-memory and/or on-disk cache
+    global _memo_bytes, _disk_bytes
+    if memory:
+        _memo.clear()
+        _memo_bytes = 0
+    if disk and os.path.isdir(DIRECTORY):
+        for entry in os.scandir(DIRECTORY):
+            if entry.name.endswith(".pkl"):
+                _remove(entry.path)
+        _disk_bytes = None
+
+
+def _feed(digest, value):
+    # adds a canonical, type-tagged form of value to digest
+    if value is None or isinstance(value, (bool, int, float, str, bytes)):
+        digest.update(("%s:%r;" % (type(value).__name__, value)).encode())
+    elif isinstance(value, np.generic):
+        _feed(digest, value.item())
+    elif isinstance(value, np.ndarray):
+        if value.dtype == object:
+            raise Uncacheable("object arrays can't be cached")
+        digest.update(("ndarray:%s:%r;" % (value.dtype.str, value.shape)).encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        digest.update(("%s:%d[" % (type(value).__name__, len(value))).encode())
+        for item in value:
+            _feed(digest, item)
+        digest.update(b"]")
+    elif isinstance(value, dict):
+        digest.update(("dict:%d{" % len(value)).encode())
+        for k in sorted(value, key=repr):
+            _feed(digest, k)
+            _feed(digest, value[k])
+        digest.update(b"}")
+    elif isinstance(value, np.random.SeedSequence):
+        _feed(digest, ("SeedSequence", value.entropy, value.spawn_key, value.pool_size))
+    elif hasattr(value, "cache_key"):
+        _feed(digest, (type(value).__name__, value.cache_key()))
+    elif hasattr(value, "__iter__") and hasattr(value, "__len__"):
+        _feed(digest, (type(value).__name__, list(value))) # e.g. interventions.Schedule
+    else:
+        raise Uncacheable("can't key a " + type(value).__name__)
+
+
+def _source(module):
+    # hash of a module's source file, worked out once per process (found by
+    # name, so it works for the script being run as __main__ too)
+    if module not in _sources:
+        digest = hashlib.sha256()
+        with open(importlib.util.find_spec(module).origin, "rb") as file:
+            digest.update(file.read())
+        _sources[module] = digest.hexdigest()
+    return _sources[module]
+
+
+def _remember(digest, blob):
+    # keeps blob in memory, dropping the least recently used past MEMO_BYTES
+    global _memo_bytes
+    if digest not in _memo:
+        _memo[digest] = blob
+        _memo_bytes += len(blob)
+    _memo.move_to_end(digest)
+    while _memo_bytes > MEMO_BYTES and _memo:
+        _memo_bytes -= len(_memo.popitem(last=False)[1])
+
+
+def _path(digest):
+    return os.path.join(DIRECTORY, digest + ".pkl")
+
+
+def _read(digest):
+    path = _path(digest)
+    try:
+        with open(path, "rb") as file:
+            blob = file.read()
+        os.utime(path) # marks it recently used
+    except OSError:
+        return None
+    return blob
+
+
+def _write(digest, blob):
+    # writes atomically (workers may share the directory) and adds the file to
+    # the running total of the cache's size. The directory is only scanned the
+    # first time and once the total passes MAX_BYTES, which also picks up what
+    # other processes wrote in the meantime
+    global _disk_bytes
+    try:
+        os.makedirs(DIRECTORY, exist_ok=True)
+        if _disk_bytes is None:
+            _disk_bytes = sum(size for _, size, _ in _scan())
+        temporary = "%s.%d.tmp" % (_path(digest), os.getpid())
+        with open(temporary, "wb") as file:
+            file.write(blob)
+        os.replace(temporary, _path(digest))
+    except OSError:
+        return # read-only or full disk, just don't cache
+    _disk_bytes += len(blob)
+    if _disk_bytes > MAX_BYTES:
+        _evict()
+
+
+def _evict():
+    # removes the least recently used files until the cache fits in MAX_BYTES
+    global _disk_bytes
+    try:
+        stats = _scan()
+    except OSError:
+        return
+    total = sum(size for _, size, _ in stats)
+    for _, size, path in sorted(stats):
+        if total <= MAX_BYTES:
+            break
+        _remove(path)
+        total -= size
+    _disk_bytes = total
+
+
+def _scan():
+    # (last used, size, path) of every cached file
+    return [(stat.st_mtime_ns, stat.st_size, entry.path) for entry in os.scandir(DIRECTORY)
+            if entry.name.endswith(".pkl") for stat in [entry.stat()]]
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass # another process got to it first
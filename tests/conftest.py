@@ -0,0 +1,13 @@
+# The modules live at the top of the repository rather than in a package, so
+# the tests put it on the path; results are never read from or written to the
+# on-disk cache.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+import result_cache
+
+result_cache.configure(enabled=False)
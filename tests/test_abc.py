@@ -0,0 +1,23 @@
+import numpy as np
+import Markov_abc
+
+
+def prior_draws(n, seed):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(Markov_abc.PRIOR[:, 0], Markov_abc.PRIOR[:, 1], (n, len(Markov_abc.PARAMS)))
+
+
+def test_pruning_drops_only_particles_over_the_tolerance():
+    # one particle per call, so it uses the same random numbers up to the day
+    # it is dropped and a survivor's distance can't change
+    theta = prior_draws(12, 0)
+    full = np.array([Markov_abc.distances(row, seed=i, mode="tau")[0]
+                     for i, row in enumerate(theta)])
+    assert np.all(np.isfinite(full))
+    tolerance = np.median(full)
+    pruned = np.array([Markov_abc.distances(row, tolerance, seed=i, mode="tau")[0]
+                       for i, row in enumerate(theta)])
+    over = full > tolerance
+    assert over.any() and not over.all()
+    assert np.all(np.isinf(pruned[over]))
+    assert np.array_equal(pruned[~over], full[~over])
@@ -0,0 +1,29 @@
+import json
+import os
+import benchmark
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_baseline_covers_every_benchmark():
+    assert set(benchmark.UNITS) == set(benchmark.BENCHMARKS)
+    with open(benchmark.BASELINE) as file:
+        baseline = json.load(file)["results"]
+    assert set(baseline) == set(benchmark.BENCHMARKS)
+
+
+def test_compare_flags_only_what_is_slower():
+    baseline = {"a": {"seconds": 1.0}, "b": {"seconds": 1.0}, "c": {"seconds": 1.0}}
+    results = {"a": {"seconds": 1.25}, "b": {"seconds": 1.35}, "c": {"seconds": 0.5},
+               "new": {"seconds": 9.0}}
+    assert benchmark.compare(results, baseline) == ["b"]
+    assert benchmark.compare(results, baseline, tolerance=0.2) == ["a", "b"]
+
+
+def test_run_measures_in_a_fresh_process(monkeypatch):
+    monkeypatch.chdir(ROOT) # the benchmarks read data from here, as benchmark.py does
+    result = benchmark.run(["r0_regression"], repeat=1)["r0_regression"]
+    assert set(result) == {"seconds", "count", "rate", "peak_mb"}
+    assert result["count"] > 0 and result["seconds"] > 0
+    assert result["rate"] == result["count"] / result["seconds"]
+    assert result["peak_mb"] > 0
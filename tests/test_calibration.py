@@ -0,0 +1,34 @@
+import numpy as np
+import calibration
+
+DAYS = np.arange(1, 40)
+
+
+def synthetic(free, truth, noise=0.0, seed=0):
+    # cases from the model at truth, with multiplicative noise on log(1 + cases)
+    setup = calibration.Calibration(DAYS, np.ones(DAYS.size), free=free)
+    cases = setup.model(np.array(truth))[0]
+    rng = np.random.default_rng(seed)
+    cases = np.expm1(np.log1p(cases) + rng.normal(0, noise, cases.size))
+    return calibration.Calibration(DAYS, cases, free=free)
+
+
+def test_fit_recovers_the_parameters():
+    truth = [0.35, 0.2]
+    fit = synthetic(("beta", "gamma"), truth, noise=0.02).fit(np.array([0.3, 0.25]))
+    np.testing.assert_allclose(fit["x"], truth, rtol=0.05)
+    assert np.all((fit["ci"][:, 0] <= truth) & (truth <= fit["ci"][:, 1]))
+    assert not fit["at_bound"].any()
+
+
+def test_intervals_stay_inside_the_bounds():
+    # the data start from more infected than the upper bound of I0 allows
+    model = synthetic(("beta", "I0"), [0.35, 150], noise=0.05)
+    fit = model.fit(np.array([0.3, 15]))
+    assert fit["at_bound"].tolist() == [False, True]
+    assert np.all(fit["ci"] >= model.lower[:, None]) and np.all(fit["ci"] <= model.upper[:, None])
+
+    intervals, fits = calibration.bootstrap(model, fit["x"], 4, seed=1, workers=1)
+    assert fits.shape == (4, 2)
+    assert np.all(intervals >= model.lower[:, None]) and np.all(intervals <= model.upper[:, None])
+    assert np.all((intervals[:, 0] <= fits.max(axis=0)) & (fits.min(axis=0) <= intervals[:, 1]))
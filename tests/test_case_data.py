@@ -0,0 +1,83 @@
+import datetime
+import os
+import numpy as np
+import pytest
+import case_data
+
+ROWS = [("Aland", "ALA", "Jan 2, 2020", 1), ("Aland", "ALA", "Jan 1, 2020", 0),
+        ("Aland", "ALA", "Jan 5, 2020", 4), ("Borduria", "", "Dec 31, 2019", 2),
+        ("Borduria", "", "Jan 1, 2020", 3)]
+
+
+def write(path, rows):
+    with open(path, "w", newline="") as file:
+        file.write("Entity,Code,Date,Total confirmed cases of COVID-19 (cases)\n")
+        for entity, code, date, total in rows:
+            file.write('%s,%s,"%s",%d\n' % (entity, code, date, total))
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = str(tmp_path / "cases.csv")
+    write(path, ROWS)
+    return path
+
+
+def test_series_and_windows(csv_path):
+    data = case_data.load(csv_path)
+    days, cases = data.series("Aland")
+    assert days.tolist() == [1, 2, 5] and cases.tolist() == [0, 1, 4] # sorted by date
+    days, cases = data.series("Aland", datetime.date(2020, 1, 2), 4)
+    assert days.tolist() == [2] and cases.tolist() == [1]
+    assert data.series("Aland", 3, 4)[0].size == 0
+    assert data.series("Borduria", end=0)[1].tolist() == [2]
+
+
+def test_cache_reused_until_the_csv_changes(csv_path, monkeypatch):
+    first = case_data.load(csv_path)
+    assert os.path.exists(csv_path + ".npz")
+    case_data._loaded.clear()
+
+    def parse(path):
+        raise AssertionError("parsed again")
+    real_parse = case_data._parse
+    monkeypatch.setattr(case_data, "_parse", parse)
+    again = case_data.load(csv_path) # from the .npz
+    assert np.array_equal(again.cases, first.cases)
+    assert case_data.load(csv_path) is again # from memory
+
+    # a new mtime with the same content is recognised by its hash
+    stat = os.stat(csv_path)
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert np.array_equal(case_data.load(csv_path).cases, first.cases)
+
+    monkeypatch.setattr(case_data, "_parse", real_parse)
+    write(csv_path, ROWS + [("Borduria", "", "Jan 2, 2020", 7)])
+    assert case_data.load(csv_path).series("Borduria")[1].tolist() == [2, 3, 7]
+
+
+def test_unreadable_cache_is_rebuilt(csv_path):
+    with open(csv_path + ".npz", "wb") as file:
+        file.write(b"not an npz")
+    assert case_data.load(csv_path).series("Aland")[1].tolist() == [0, 1, 4]
+    case_data._loaded.clear()
+    assert case_data.load(csv_path).series("Aland")[1].tolist() == [0, 1, 4]
+
+
+def test_store_matches_load(csv_path, tmp_path):
+    directory = str(tmp_path / "store")
+    store = case_data.open_store(directory, csv_path)
+    data = case_data.load(csv_path)
+    assert isinstance(store.cases, np.memmap)
+    assert [name for name, _, _ in store] == data.names
+    for name, days, cases in store:
+        assert np.array_equal(days, data.series(name)[0])
+        assert np.array_equal(cases, data.series(name)[1])
+
+
+def test_store_rebuilt_when_the_csv_changes(csv_path, tmp_path):
+    directory = str(tmp_path / "store")
+    case_data.open_store(directory, csv_path)
+    write(csv_path, ROWS + [("Borduria", "", "Jan 2, 2020", 7)])
+    store = case_data.open_store(directory, csv_path)
+    assert store.series("Borduria")[1].tolist() == [2, 3, 7]
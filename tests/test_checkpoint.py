@@ -0,0 +1,57 @@
+import numpy as np
+import Markov_checkpoint
+
+PARAMS = dict(N=400, I0=8, k=0.02, gamma=0.01, schedule=[(300, 0.6)], seed=11, batch=20,
+              record=50)
+
+
+def assert_same(a, b):
+    assert a.tick == b.tick
+    for x, y in zip(a.batches, b.batches):
+        for name in "SIR":
+            assert np.array_equal(x[name], y[name])
+        assert x["rng"].bit_generator.state == y["rng"].bit_generator.state
+    for x, y in zip(a.stats, b.stats):
+        assert x.count == y.count
+        for field in ("mean", "m2", "min", "max"):
+            np.testing.assert_allclose(getattr(x, field), getattr(y, field), rtol=1e-12)
+
+
+def test_save_load_advance_matches_uninterrupted(tmp_path):
+    whole = Markov_checkpoint.EnsembleRun(**PARAMS)
+    whole.add_replicates(40)
+    whole.run(600, every=200)
+
+    path = str(tmp_path / "run.npz")
+    part = Markov_checkpoint.EnsembleRun(**PARAMS)
+    part.add_replicates(40)
+    part.run(200, every=200, path=path)
+    resumed = Markov_checkpoint.EnsembleRun.load(path)
+    resumed.run(600, every=200)
+    assert_same(whole, resumed)
+    assert whole.stats[0].mean.size == 600 // 50 + 1
+
+
+def test_top_up_matches_running_all_at_once():
+    whole = Markov_checkpoint.EnsembleRun(**PARAMS)
+    whole.add_replicates(40)
+    whole.advance(400)
+
+    topped = Markov_checkpoint.EnsembleRun(**PARAMS)
+    topped.add_replicates(20)
+    topped.advance(400)
+    topped.add_replicates(20)
+    assert_same(whole, topped)
+
+
+def test_stats_end_with_the_last_tick():
+    run = Markov_checkpoint.EnsembleRun(**PARAMS)
+    run.add_replicates(20)
+    run.run(130, every=60)
+    assert run.stats[0].mean.size == 130 // 50 + 2 # 0, 50, 100 and 130
+    run.advance(70)
+    assert run.stats[0].mean.size == 200 // 50 + 1
+    # the last column is the replicates' current state
+    for name, stat in zip("SIR", run.stats):
+        state = np.concatenate([batch[name] for batch in run.batches])
+        assert np.isclose(stat.mean[-1], state.mean())
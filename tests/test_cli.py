@@ -0,0 +1,39 @@
+import json
+import os
+import subprocess
+import sys
+import numpy as np
+import cli
+import Markov_SIR_validation
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ["SIR_Modeling", "Markov_SIR", "Markov_Q_comp", "Markov_start_date",
+           "Markov_SIR_validation", "R0_extraction", "calibration", "Markov_abc",
+           "Markov_metapop", "Markov_network", "render", "cli"]
+
+
+def test_importing_runs_nothing(tmp_path):
+    # no simulation, no files written and no matplotlib until something is plotted
+    code = ("import sys\nsys.path.insert(0, %r)\nimport %s\n"
+            "assert 'matplotlib' not in sys.modules, 'matplotlib imported'\n"
+            % (ROOT, ", ".join(MODULES)))
+    subprocess.run([sys.executable, "-c", code], cwd=str(tmp_path), check=True, timeout=120)
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_validation_saves_its_arrays(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path) # main() moves to the repository, the paths stay relative to here
+    cli.main(["validation", "--steps", "2000", "--seed", "3", "--no-plot", "--no-cache",
+              "--save", "out.npz", "--report", "report.json"])
+    t_arr, delta_I, delta_R = Markov_SIR_validation.run(steps=2000, seed=3)
+    with np.load(str(tmp_path / "out.npz")) as saved:
+        assert np.array_equal(saved["t"], t_arr)
+        assert np.array_equal(saved["delta_I"], delta_I)
+        assert np.array_equal(saved["delta_R"], delta_R)
+    assert t_arr[-1] == 2000 / Markov_SIR_validation.t0
+
+    with open(str(tmp_path / "report.json")) as file:
+        report = json.load(file)
+    assert report["entry"] == "validation"
+    assert report["argv"][0] == "validation"
+    assert report["counters"]["ticks"] == 2000
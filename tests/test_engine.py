@@ -0,0 +1,163 @@
+import random
+import numpy as np
+import pytest
+import scipy.integrate
+import scipy.optimize as opt
+import instrument
+import interventions
+import Markov_engine
+
+# small enough chances per tick that the tick chain never has to cap them at
+# one event, so it and the continuous-time modes have the same statistics
+N, I0, K, GAMMA = 100, 5, 0.01, 0.005
+STEPS = 2000
+SCHEDULE = [(1000, 0.6)]
+GRID = np.arange(0, STEPS + 1, 250)
+
+
+def scalar_chain(sims, seed):
+    # one replicate at a time, the way Markov_SIR stepped before the engine
+    rng = random.Random(seed)
+    factors = interventions.Schedule(SCHEDULE)(np.arange(STEPS)).tolist()
+    out = np.zeros((3, sims, GRID.size))
+    for a in range(sims):
+        S, I, R = N - I0, I0, 0
+        out[:, a, 0] = S, I, R
+        for t in range(STEPS):
+            delta_I = K * S * I / N * factors[t]
+            delta_R = GAMMA * I
+            step = rng.random()
+            if step < delta_I:
+                S -= 1
+                I += 1
+            elif step < delta_I + delta_R:
+                I -= 1
+                R += 1
+            if (t + 1) % 250 == 0:
+                out[:, a, (t + 1) // 250] = S, I, R
+    return out
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return scalar_chain(300, 1)
+
+
+@pytest.mark.parametrize("mode", ["tick", "ssa", "tau"])
+def test_mean_and_std_match_scalar_chain(reference, mode):
+    sims = 2000
+    X = np.array(Markov_engine.simulate(N, I0, K, GAMMA, STEPS, sims, SCHEDULE, seed=5,
+                                        mode=mode, record=250))
+    for ref, run in zip(reference, X):
+        # allow 4 standard errors of the difference of the means, and 25% on the std
+        error = np.sqrt(ref.var(axis=0) / ref.shape[0] + run.var(axis=0) / sims)
+        assert np.all(np.abs(ref.mean(axis=0) - run.mean(axis=0)) <= 4 * error + 1e-9)
+        assert np.allclose(run.std(axis=0), ref.std(axis=0), rtol=0.25, atol=1)
+
+
+@pytest.mark.parametrize("mode", Markov_engine.MODES)
+def test_counts_conserved(mode):
+    S, I, R = Markov_engine.simulate(N, I0, K, GAMMA, STEPS, 50, SCHEDULE, seed=2, mode=mode,
+                                     threshold=20)
+    assert np.all(S + I + R == N)
+    assert np.all(S[:, 0] == N - I0) and np.all(I[:, 0] == I0)
+    assert np.all(np.diff(S, axis=1) <= 0) and np.all(np.diff(R, axis=1) >= 0)
+
+
+@pytest.mark.parametrize("mode", Markov_engine.MODES)
+def test_record_is_a_subset_of_every_tick(mode):
+    full = Markov_engine.simulate(N, I0, K, GAMMA, STEPS, 40, SCHEDULE, seed=9, mode=mode,
+                                  threshold=20)
+    grid = np.array([0, 7, 1000, 1001, STEPS])
+    sparse = Markov_engine.simulate(N, I0, K, GAMMA, STEPS, 40, SCHEDULE, seed=9, mode=mode,
+                                    record=grid, threshold=20)
+    for X, Y in zip(full, sparse):
+        assert np.array_equal(X[:, grid], Y)
+
+
+def test_hybrid_follows_the_ode():
+    # started over the threshold every replicate is on the ODE until fewer
+    # than half the threshold are infected (the last column here)
+    n, i0, threshold = 100000, 2000, 1000
+    S, I, R = Markov_engine.simulate(n, i0, K, GAMMA, STEPS, 20, SCHEDULE, seed=3, mode="hybrid",
+                                     record=250, threshold=threshold)
+
+    def sir(t, y, factor):
+        infections = K * factor * y[0] * y[1] / n
+        return [-infections, infections - GAMMA * y[1]]
+    before = scipy.integrate.solve_ivp(sir, (0, 1000), [n - i0, i0], args=(1.0,), rtol=1e-10,
+                                       dense_output=True)
+    after = scipy.integrate.solve_ivp(sir, (1000, STEPS), before.sol(1000), args=(0.6,),
+                                      rtol=1e-10, dense_output=True)
+    ode = np.where(GRID <= 1000, before.sol(np.minimum(GRID, 1000)),
+                   after.sol(np.maximum(GRID, 1000)))
+    assert ode[1, -2] > threshold / 2 > ode[1, -1]
+    assert np.all(S[:, :-1] == S[0, :-1]) # deterministic while on the ODE
+    assert np.allclose(S.mean(axis=0), ode[0], rtol=0, atol=1e-4 * n)
+    assert np.allclose(I[:, :-1].mean(axis=0), ode[1, :-1], rtol=0, atol=1e-4 * n)
+    assert np.all(S + I + R == n)
+
+
+def test_hybrid_final_size():
+    # started on the chain, outbreaks that take off switch to the ODE and end
+    # at the final size z = 1 - exp(-R0 z). The threshold keeps the chain's
+    # chances of an event under 1 a tick, where it isn't capped
+    n, R0 = 100000, K / GAMMA
+    S, I, R = Markov_engine.simulate(n, I0, K, GAMMA, 8000, 40, seed=3, mode="hybrid",
+                                     record=1000, threshold=50)
+    z = opt.brentq(lambda z: z - 1 + np.exp(-R0 * z), 0.1, 1)
+    outbreak = S[:, -1] < n / 2
+    assert outbreak.sum() >= 30 # chance of dying out is (1 / R0) ** I0
+    assert np.all(I[:, -1] == 0)
+    assert np.all(np.abs(1 - S[outbreak, -1] / n - z) < 0.002)
+
+
+def test_schedule_only_changes_the_run_after_it():
+    # common random numbers: runs that differ only after tick 1000 agree up to it
+    base = Markov_engine.simulate(N, I0, K, GAMMA, STEPS, 40, seed=4)
+    cut = Markov_engine.simulate(N, I0, K, GAMMA, STEPS, 40, SCHEDULE, seed=4)
+    assert np.array_equal(base[1][:, :1001], cut[1][:, :1001])
+    assert not np.array_equal(base[1], cut[1])
+
+
+def test_grid_ends_with_the_last_tick():
+    assert Markov_engine.output_grid(100, 60).tolist() == [0, 60, 100]
+    assert Markov_engine.output_grid(120, 60).tolist() == [0, 60, 120]
+    assert Markov_engine.output_grid(100, [7, 50]).tolist() == [7, 50, 100]
+    assert np.array_equal(Markov_engine.tick_times(100, 10, 60), [0, 6, 10])
+    full = Markov_engine.simulate(N, I0, K, GAMMA, STEPS - 10, 20, seed=6)
+    sparse = Markov_engine.simulate(N, I0, K, GAMMA, STEPS - 10, 20, seed=6, record=250)
+    for X, Y in zip(full, sparse):
+        assert np.array_equal(X[:, -1], Y[:, -1])
+
+
+def test_tick_counters_add_up():
+    instrument.start()
+    Markov_engine.simulate(N, I0, K, GAMMA, STEPS - 10, 20, seed=6, record=250)
+    counters = instrument.stop()["counters"]
+    assert counters["events"] + counters["noop_ticks"] == counters["ticks"] == (STEPS - 10) * 20
+
+
+@pytest.mark.parametrize("mode", ["tick", "ssa"])
+def test_first_passage_extinction_is_one_over_r0(mode):
+    # a single case dies out with probability 1 / R0 in a large population,
+    # and practically never once it has reached 100 cases
+    sims = 4000
+    ticks, extinct = Markov_engine.first_passage(10000, 1, 0.02, 0.01, 100, 100000, sims, seed=8,
+                                                 mode=mode)
+    assert abs(extinct.mean() - 0.5) <= 4 * np.sqrt(0.25 / sims)
+    assert np.all(np.isnan(ticks) == extinct)
+    assert np.all(ticks[~extinct] > 0)
+
+
+def test_first_passage_matches_the_full_run():
+    # the tick the full chain first has I + R >= 30, on a grid of every tick
+    S, I, R = Markov_engine.simulate(N, I0, K, GAMMA, STEPS, 400, seed=3)
+    reached = (N - S) >= 30
+    full = np.where(reached.any(axis=1), reached.argmax(axis=1) - 1, -1)
+    ticks, extinct = Markov_engine.first_passage(N, I0, K, GAMMA, 30, STEPS, 4000, seed=3)
+    hit = ticks[~np.isnan(ticks)]
+    full = full[full >= 0]
+    assert abs(full.size / 400 - hit.size / 4000) < 4 * np.sqrt(0.25 / 400)
+    error = np.sqrt(full.var() / full.size + hit.var() / hit.size)
+    assert abs(full.mean() - hit.mean()) < 4 * error
@@ -0,0 +1,51 @@
+import numpy as np
+import Markov_engine
+import Markov_ensemble
+
+N, I0, K, GAMMA = 300, 5, 0.01, 0.005
+STEPS = 3000
+
+
+def test_results_do_not_depend_on_workers():
+    one = Markov_ensemble.ensemble(N, I0, K, GAMMA, STEPS, 60, seed=5, batch=20, workers=1,
+                                   record=100)
+    two = Markov_ensemble.ensemble(N, I0, K, GAMMA, STEPS, 60, seed=5, batch=20, workers=2,
+                                   record=100)
+    for a, b in zip(one, two):
+        assert a.count == b.count == 60
+        assert np.array_equal(a.mean, b.mean) and np.array_equal(a.m2, b.m2)
+
+
+def test_running_stats_match_numpy():
+    rng = np.random.default_rng(1)
+    X = rng.poisson(rng.uniform(0, 500, 30), (250, 30))
+    stats = Markov_ensemble.RunningStats(30, quantiles=True, top=2000)
+    for rows in np.array_split(X, [10, 11, 100]):
+        part = Markov_ensemble.RunningStats(30, quantiles=True, top=2000)
+        part.update(rows)
+        stats.merge(part)
+    assert stats.count == 250
+    np.testing.assert_allclose(stats.mean, X.mean(axis=0))
+    np.testing.assert_allclose(stats.std, X.std(axis=0))
+    assert np.array_equal(stats.min, X.min(axis=0)) and np.array_equal(stats.max, X.max(axis=0))
+    # quantiles are exact below 1 / resolution and within the resolution above
+    np.testing.assert_allclose(stats.quantile(0.5), np.quantile(X, 0.5, axis=0, method="lower"),
+                               rtol=0.05, atol=1)
+
+
+def test_compare_shares_the_prefix_and_the_noise():
+    split = 1000
+    scenarios = [[], [(1500, 0.5)], [(1000, 0.2)]]
+    stats, differences = Markov_ensemble.compare(N, I0, K, GAMMA, STEPS, 200, split, scenarios,
+                                                 seed=2, workers=1, record=100)
+    columns = Markov_engine.output_grid(STEPS, 100) <= split
+    for scenario in stats[1:]:
+        for a, b in zip(stats[0], scenario):
+            assert np.array_equal(a.mean[columns], b.mean[columns])
+            assert np.array_equal(a.m2[columns], b.m2[columns])
+    assert np.all(differences[0].mean == 0) and np.all(differences[0].std == 0)
+    # the scenarios run on the same random numbers, so their difference in
+    # cases (N - S) varies much less than that of independent ensembles would
+    for n in (1, 2):
+        independent = stats[0][0].std[-1] ** 2 + stats[n][0].std[-1] ** 2
+        assert differences[n].std[-1] ** 2 < 0.6 * independent
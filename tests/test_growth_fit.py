@@ -0,0 +1,67 @@
+import os
+import numpy as np
+import growth_fit
+import R0_extraction
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def original_fit(dates, log_cases):
+    # the sums R0_extraction.py used to fit with, one point at a time
+    sum_x = sum_x_squared = sum_y = sum_xy = 0
+    length = len(dates)
+    for n in range(0, length):
+        sum_x += dates[n]
+        sum_x_squared += dates[n] ** 2
+        sum_y += log_cases[n]
+        sum_xy += log_cases[n] * dates[n]
+    delta = length * sum_x_squared - sum_x ** 2
+    A = (sum_x_squared * sum_y - sum_x * sum_xy) / delta
+    B = (length * sum_xy - sum_x * sum_y) / delta
+    sigma_y = 0
+    for n in range(0, length):
+        sigma_y += (log_cases[n] - A - B * dates[n]) ** 2
+    sigma_y = np.sqrt(sigma_y / (length - 2))
+    return A, B, sigma_y * np.sqrt(sum_x_squared / delta), sigma_y * np.sqrt(length / delta)
+
+
+def test_march_fit_matches_the_original(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    # the rows the original script read: the 13 New Zealand lines from the 7th of March
+    with open("total-cases-covid-19.csv") as file:
+        data = [line for line in file if line[0:11] == "New Zealand"]
+    n = 0
+    while data[n][17:20] != "Mar":
+        n += 1
+    lines = [line.split(",") for line in data[n + 6:n + 19]]
+    dates = [int(line[2][5:]) for line in lines]
+    log_cases = [np.log(int(line[-1])) for line in lines]
+
+    got_dates, got_log_cases, *fit = R0_extraction.march_fit()
+    assert got_dates.tolist() == dates
+    np.testing.assert_allclose(got_log_cases, log_cases)
+    np.testing.assert_allclose(fit, original_fit(dates, log_cases), rtol=1e-9)
+
+
+def test_windows_match_one_fit_each():
+    rng = np.random.default_rng(0)
+    starts = np.array([0, 30, 31, 70])
+    days = np.concatenate([np.arange(30), [5], np.arange(39)])
+    cases = np.exp(0.2 * days + rng.normal(0, 0.1, days.size)).round() + 1
+    cases[50] = 0 # below min_cases, no window may include it
+    windows = growth_fit.fit_windows(days, cases, starts, [5, 12], min_cases=1)
+    assert windows["B"].size > 0
+    for i in range(windows["B"].size):
+        first = windows["start"][i]
+        rows = slice(first, first + windows["length"][i])
+        country = windows["country"][i]
+        assert starts[country] <= first and rows.stop <= starts[country + 1]
+        assert np.all(cases[rows] >= 1)
+        expected = original_fit(days[rows].tolist(), np.log(cases[rows]).tolist())
+        got = [windows[key][i] for key in ("A", "B", "sigma_A", "sigma_B")]
+        np.testing.assert_allclose(got, expected, rtol=1e-6, atol=1e-9)
+
+    best = growth_fit.best_windows(windows)
+    growing = np.where(windows["B"] > 0, windows["r2"], np.nan)
+    for i in best:
+        assert windows["r2"][i] == np.nanmax(growing[windows["country"] == windows["country"][i]])
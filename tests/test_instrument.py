@@ -0,0 +1,53 @@
+import json
+import sys
+import time
+import instrument
+
+
+def double(x):
+    instrument.count(calls=1, total=x)
+    return 2 * x
+
+
+def test_phases_and_counters():
+    assert instrument.stop() is None
+    instrument.count(ticks=5) # off: nothing to add to
+    instrument.start("test")
+    try:
+        with instrument.phase("outer"):
+            time.sleep(0.05)
+            with instrument.phase("inner"):
+                time.sleep(0.1)
+            instrument.count(ticks=3)
+        instrument.count(ticks=4, events=1)
+    finally:
+        report = instrument.stop()
+    assert not instrument.enabled()
+    assert report["entry"] == "test"
+    assert report["counters"] == {"ticks": 7, "events": 1}
+    phases = report["phases"]
+    assert phases["inner"] >= 0.1
+    assert 0.05 <= phases["outer"] < phases["inner"] # the inner time isn't charged twice
+    assert phases["outer"] + phases["inner"] <= report["seconds"]
+    json.dumps(report)
+
+
+def test_worker_counters_are_gathered():
+    assert instrument.worker(double) is double
+    instrument.start()
+    try:
+        results = instrument.gather([instrument.worker(double)(x) for x in (1, 2, 3)])
+    finally:
+        report = instrument.stop()
+    assert results == [2, 4, 6]
+    assert report["counters"] == {"calls": 3, "total": 6}
+
+
+def test_peak_without_resource(monkeypatch):
+    assert instrument._peak() > 0
+    monkeypatch.setitem(sys.modules, "resource", None) # as on Windows: importing it fails
+    assert instrument._peak() is None
+    assert instrument._peak(children=True) is None
+    instrument.start()
+    report = instrument.stop()
+    assert report["peak_mb"] is None and report["peak_workers_mb"] is None
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+import interventions
+
+QDAYS = (41, 43, 45, 47)
+QMULTS = (0.8, 0.7, 0.6, 0.5)
+
+
+def old_multiplier(day, q1, q2, q3, q4):
+    # the if/elif chain SIR.advance used before the schedule table
+    if day >= q1 and day < q2:
+        return 0.8
+    elif day >= q2 and day < q3:
+        return 0.7
+    elif day >= q3 and day < q4:
+        return 0.6
+    elif day >= q4:
+        return 0.5
+    return 1.0
+
+
+@pytest.mark.parametrize("qdays", [QDAYS, (40.5, 43.25, 45, 47), (0, 1, 2, 3), (10, 10, 20, 30)])
+def test_schedule_matches_if_elif(qdays):
+    schedule = interventions.Schedule(zip(qdays, QMULTS))
+    days = np.concatenate([np.arange(-2, 60, 0.25), np.asarray(qdays, dtype=float)])
+    expected = [old_multiplier(day, *qdays) for day in days]
+    assert [schedule(day) for day in days] == expected
+    assert schedule(days).tolist() == expected
+
+
+def test_schedule_order_and_ties():
+    schedule = interventions.Schedule([(20, 0.5), (10, 0.8), (20, 0.3)])
+    assert list(schedule) == [(10.0, 0.8), (20.0, 0.3)]
+    assert [schedule(t) for t in (9.9, 10, 19.9, 20, 1e9)] == [1.0, 0.8, 0.8, 0.3, 0.3]
+
+
+def test_local_table():
+    schedule = interventions.Schedule([(100, 0.9), (250, 0.5), (400, 0.2)])
+    bounds, factors, ends = schedule.local(150, 200)
+    assert bounds.tolist() == [100]
+    assert factors.tolist() == [0.9, 0.5]
+    assert ends.tolist() == [100, 200]
+    assert schedule.segments(0, 300) == [(0, 100.0, 1.0), (100.0, 250.0, 0.9), (250.0, 300, 0.5)]
+
+
+def test_piecewise_matches_schedules():
+    rng = np.random.default_rng(3)
+    times = np.sort(rng.uniform(0, 50, (6, 4)), axis=1)
+    factors = rng.uniform(0, 1, (6, 5))
+    t = np.linspace(-1, 60, 123)
+    values = interventions.piecewise(times, factors, t)
+    for row in range(6):
+        schedule = interventions.Schedule(zip(times[row], factors[row, 1:]))
+        expected = np.where(t < times[row, 0], factors[row, 0], schedule(t))
+        assert np.array_equal(values[row], expected)
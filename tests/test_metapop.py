@@ -0,0 +1,40 @@
+import numpy as np
+import scipy.sparse as sparse
+import Markov_engine
+import Markov_metapop
+
+N, I0, K, GAMMA = 300, 5, 0.01, 0.005
+STEPS = 3000
+SCHEDULE = [(1500, 0.5)]
+
+
+def test_single_patch_matches_ssa():
+    runs = 300
+    X = np.zeros((3, runs, STEPS // 250 + 1))
+    for a in range(runs):
+        X[:, a] = np.array(Markov_metapop.simulate([N], I0, K, GAMMA, sparse.identity(1), STEPS,
+                                                   SCHEDULE, seed=a, record=250))[:, 0]
+    ssa = np.array(Markov_engine.simulate(N, I0, K, GAMMA, STEPS, 2000, SCHEDULE, seed=1,
+                                          mode="ssa", record=250))
+    for ref, run in zip(ssa, X):
+        error = np.sqrt(ref.var(axis=0) / ref.shape[0] + run.var(axis=0) / runs)
+        assert np.all(np.abs(ref.mean(axis=0) - run.mean(axis=0)) <= 4 * error + 1e-9)
+        assert np.allclose(run.std(axis=0), ref.std(axis=0), rtol=0.25, atol=1)
+
+
+def test_patches_only_infect_through_mixing():
+    # patch 2 mixes with nobody, so it never gets infected; patch 1 only with patch 0
+    mixing = sparse.csr_matrix([[0.9, 0.1, 0], [0.1, 0.9, 0], [0, 0, 1]])
+    S, I, R = Markov_metapop.simulate([1000, 1000, 1000], [20, 0, 0], 0.02, 0.005, mixing,
+                                      STEPS, seed=3)
+    assert np.all(S + I + R == 1000)
+    assert np.all(S[2] == 1000) and S[1, -1] < 1000
+    assert S.shape == (3, STEPS // Markov_metapop.RECORD + 2) # and the last tick
+
+
+def test_coupling_is_row_stochastic():
+    neighbours = sparse.csr_matrix([[0, 1, 3], [1, 0, 0], [0, 0, 0]])
+    mixing = Markov_metapop.coupling(neighbours, 0.2).toarray()
+    np.testing.assert_allclose(mixing.sum(axis=1), 1)
+    np.testing.assert_allclose(mixing[0], [0.8, 0.05, 0.15])
+    np.testing.assert_allclose(mixing[2], [0, 0, 1])
@@ -0,0 +1,30 @@
+import numpy as np
+import scipy.optimize as opt
+import Markov_network
+
+
+def test_final_size_matches_percolation():
+    # on a random graph with mean degree c every contact transmits with chance
+    # T = beta / (beta + gamma), and the share infected by a large outbreak is
+    # the z solving z = 1 - exp(-c T z) (c T = R0)
+    n, R0, gamma = 20000, 2.0, 0.01
+    graph = Markov_network.random_graph(n, 8, seed=1)
+    beta = Markov_network.transmission_rate(R0, gamma, graph[0])
+    expected = opt.brentq(lambda z: z - 1 + np.exp(-R0 * z), 0.1, 1)
+    sizes = []
+    for seed in range(3):
+        S, I, R, infected = Markov_network.simulate(graph, 20, beta, gamma, 100000, seed=seed,
+                                                    record=10000)
+        assert I[-1] == 0
+        sizes.append(1 - S[-1] / n)
+    assert abs(np.mean(sizes) - expected) < 0.02
+
+
+def test_counts_and_infection_times_agree():
+    graph = Markov_network.random_graph(2000, 6, seed=2)
+    S, I, R, infected = Markov_network.simulate(graph, 10, 0.02, 0.01, 3000, seed=4, record=250)
+    assert I[0] == 10 and S[0] == 1990
+    assert np.all(S + I + R == 2000)
+    cases = 2000 - S
+    for column, tick in enumerate(range(0, 3001, 250)):
+        assert cases[column] == (np.count_nonzero(infected < tick) if tick else 10)
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+import render
+
+
+def test_decimate_keeps_the_extremes():
+    rng = np.random.default_rng(2)
+    x = np.arange(100001) / 24
+    walk = rng.normal(size=x.size).cumsum()
+    spikes = np.zeros(x.size)
+    spikes[[5, 54321, 99999]] = [3, -7, 11]
+    t, a, b = render.decimate(x, walk, spikes, points=2000)
+    assert t.size <= 4000 and np.all(np.diff(t) > 0)
+    assert t[0] == x[0] and t[-1] == x[-1]
+    for full, thin in ((walk, a), (spikes, b)):
+        assert thin.min() == full.min() and thin.max() == full.max()
+    assert np.count_nonzero(b) == 3
+
+    short = render.decimate(x[:100], walk[:100], points=2000)
+    assert np.array_equal(short[0], x[:100]) and np.array_equal(short[1], walk[:100])
+
+
+def test_render_all_writes_a_figure_per_file(tmp_path):
+    t = np.arange(5000) / 24
+    paths = []
+    for name in ("a", "b"):
+        path = str(tmp_path / (name + ".npz"))
+        np.savez(path, t=t, delta_I=np.sin(t) ** 2 / 100, delta_R=np.cos(t) ** 2 / 100)
+        paths.append(path)
+    out = tmp_path / "figures"
+    out.mkdir()
+    written = render.render_all(paths, str(out), workers=2)
+    assert written == [str(out / "a.png"), str(out / "b.png")]
+    for path in written:
+        with open(path, "rb") as file:
+            assert file.read(8) == b"\x89PNG\r\n\x1a\n"
+
+    other = str(tmp_path / "other.npz")
+    np.savez(other, x=t)
+    with pytest.raises(ValueError):
+        render.render(other)
@@ -0,0 +1,84 @@
+import os
+import time
+import numpy as np
+import pytest
+import result_cache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    # an empty, enabled cache in tmp_path, put back as conftest left it afterwards
+    saved = result_cache.DIRECTORY, result_cache.MAX_BYTES, result_cache.MEMO_BYTES
+    result_cache.clear(disk=False)
+    result_cache.configure(enabled=True, directory=str(tmp_path / "cache"))
+    yield tmp_path / "cache"
+    result_cache.clear(disk=False)
+    result_cache.configure(enabled=False, directory=saved[0], max_bytes=saved[1],
+                           memo_bytes=saved[2])
+
+
+def test_key_is_canonical():
+    params = {"N": 100, "k": 0.01, "schedule": [(1000, 0.6)], "x": np.arange(3)}
+    same = {"x": np.arange(3), "schedule": [(1000, 0.6)], "k": 0.01, "N": np.int64(100)}
+    assert result_cache.key("f", params) == result_cache.key("f", same)
+    for changed in ({"N": 100.0}, {"k": 0.010000001}, {"schedule": [(1000, 0.5)]},
+                    {"x": np.arange(3.0)}, {"x": np.arange(3).reshape(1, 3)}):
+        assert result_cache.key("f", params) != result_cache.key("f", dict(params, **changed))
+    assert result_cache.key("f", params) != result_cache.key("g", params)
+    assert result_cache.key("f", params) != result_cache.key("f", params, ("instrument",))
+    with pytest.raises(result_cache.Uncacheable):
+        result_cache.key("f", {"x": np.array([None])})
+
+
+def test_memoize_skips_random_runs(cache):
+    calls = []
+
+    @result_cache.memoize("test.draw")
+    def draw(n, seed=None, workers=None):
+        calls.append(seed)
+        return np.random.default_rng(seed).random(n)
+
+    first = draw(5, seed=1)
+    first[:] = 0 # a hit must not hand back what the caller changed
+    again = draw(5, seed=1, workers=4)
+    assert calls == [1]
+    assert np.array_equal(again, np.random.default_rng(1).random(5))
+    draw(6, seed=1)
+    assert calls == [1, 1]
+
+    draw(5)
+    draw(5)
+    assert calls == [1, 1, None, None]
+
+    result_cache.clear(disk=False) # from the files this time
+    draw(5, seed=1)
+    assert calls == [1, 1, None, None]
+    result_cache.clear()
+    draw(5, seed=1)
+    assert calls == [1, 1, None, None, 1]
+
+
+def test_eviction_drops_least_recently_used(cache):
+    result_cache.configure(max_bytes=20000, memo_bytes=0) # every hit reads its file
+    calls = []
+
+    def get(name):
+        def compute():
+            calls.append(name)
+            return np.zeros(1000) # 8 kB pickled, three are over the limit
+        result = result_cache.cached(name, compute, {})
+        time.sleep(0.02) # apart on the file clock
+        return result
+
+    get("a")
+    get("b")
+    get("a") # now b is the least recently used
+    get("c")
+    assert calls == ["a", "b", "c"]
+    assert len(os.listdir(str(cache))) == 2
+    assert sum(entry.stat().st_size for entry in os.scandir(str(cache))) <= 20000
+    get("a")
+    get("c")
+    assert calls == ["a", "b", "c"]
+    get("b")
+    assert calls == ["a", "b", "c", "b"]
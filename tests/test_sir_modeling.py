@@ -0,0 +1,53 @@
+# data/sir_reference.npz holds getSets from the original SIR class and sweep
+# from the commit that added it, with the parameters below
+
+import os
+import numpy as np
+import SIR_Modeling
+
+REFERENCE = os.path.join(os.path.dirname(__file__), "data", "sir_reference.npz")
+ICS = [1000000, 15, 0, 0, 0]
+
+
+def reference(name):
+    with np.load(REFERENCE) as saved:
+        return saved[name]
+
+
+def test_getsets_unchanged():
+    sets = SIR_Modeling.SIR(ICS, [0.308, 0.25, 0.01, 41, 43, 45, 47]).getSets(120)
+    assert np.array_equal(np.array(sets), reference("getSets"))
+    sets = SIR_Modeling.SIR(ICS, [0.308, 0.25, 0.01, 40.5, 43.25, 45, 47]).getSets(240, 0.5)
+    assert np.array_equal(np.array(sets), reference("getSets_half"))
+
+
+def test_solve_is_the_limit_of_getsets():
+    # forward Euler's error shrinks with dt, towards what solve gives at any dt
+    model = SIR_Modeling.SIR(ICS, [0.308, 0.25, 0.01, 41, 43, 45, 47])
+    out = model.solve(120)
+    assert model.nfev < 1000
+    np.testing.assert_allclose(model.solve(240, 0.5)[:, ::2], out, rtol=0, atol=1e-6)
+    for dt, error in ((0.1, 10), (0.01, 1)):
+        n = int(round(1 / dt))
+        sets = np.array(model.getSets(120 * n, dt))[:, ::n]
+        np.testing.assert_allclose(sets, out, rtol=0, atol=error)
+
+
+def test_sweep_unchanged():
+    # the shared compartment model sums the same terms in another order, so the
+    # last bits can differ from the original sweep
+    beta = np.linspace(0.2, 0.4, 4)[:, None]
+    q1 = np.array([10.0, 20.5, 30.0])[None, :]
+    out = SIR_Modeling.sweep(ICS, beta, 0.25, 0.01, q1, q1 + 2, q1 + 4, q1 + 6, 200, 0.5, 4)
+    np.testing.assert_allclose(out, reference("sweep"), rtol=1e-12)
+    out = SIR_Modeling.sweep(ICS, 0.3, 0.25, 0.0, 20, 25, 30, 35, 100, 1, 1, (0.9, 0.5, 0.4, 0.3))
+    np.testing.assert_allclose(out, reference("sweep_qmults"), rtol=1e-12)
+
+
+def test_sweep_rows_match_single_sweeps():
+    # per-set quarantine strengths give the same answer as one sweep per set
+    qmults = np.array([[0.8, 0.7, 0.6, 0.5], [0.9, 0.5, 0.4, 0.3]])
+    out = SIR_Modeling.sweep(ICS, 0.3, 0.25, 0.01, 20, 25, 30, 35, 80, 1, 1, qmults)
+    for row, mults in enumerate(qmults):
+        single = SIR_Modeling.sweep(ICS, 0.3, 0.25, 0.01, 20, 25, 30, 35, 80, 1, 1, tuple(mults))
+        assert np.array_equal(out[row], single[0])